@@ -2,14 +2,17 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
 import json
 import random
 import re
 
 from env import Action, ActionType, GameState
+from llm_clients import _json_loads
 
 ChatFn = Callable[[List[Dict[str, str]]], str]
+AsyncChatFn = Callable[[List[Dict[str, str]]], Awaitable[str]]
 
 
 @dataclass
@@ -38,15 +41,35 @@ class RandomAgent:
         )
         return action
 
+    async def decide(self, state: GameState, legal_actions: List[Action]) -> Action:
+        return self.choose_action(state, legal_actions)
 
-class LLMJsonAgent:
-    """LLM agent with improved JSON parsing and clearer prompts."""
 
-    def __init__(self, name: str, chat_fn: ChatFn) -> None:
+class LLMJsonAgent:
+    """
+    LLM agent with improved JSON parsing and clearer prompts.
+
+    `verbose=False` silences the per-decision lines (chosen action, fallback
+    choice); the emergency-fallback warning is always printed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        chat_fn: ChatFn,
+        async_chat_fn: Optional[AsyncChatFn] = None,
+        verbose: bool = True,
+    ) -> None:
         self.name = name
         self.chat_fn = chat_fn
+        self.async_chat_fn = async_chat_fn
+        self.verbose = verbose
         self.last_decision_info: Optional[StepDecisionInfo] = None
 
+    def _say(self, message: str) -> None:
+        if self.verbose:
+            print(message)
+
     def _serialize_state(self, state: GameState) -> str:
         """Convert GameState into JSON."""
         return json.dumps(
@@ -107,32 +130,29 @@ class LLMJsonAgent:
         """
         # 1) Direct parse
         try:
-            return json.loads(raw.strip())
-        except Exception:
+            return _json_loads(raw.strip())
+        except ValueError:
             pass
 
         # 2) Strip markdown fences
         cleaned = re.sub(r"```(?:json)?\s*|\s*```", "", raw, flags=re.IGNORECASE)
         try:
-            return json.loads(cleaned.strip())
-        except Exception:
+            return _json_loads(cleaned.strip())
+        except ValueError:
             pass
 
         # 3) Find first {...} block
         match = re.search(r"\{[^}]*\"action_index\"[^}]*\}", raw, flags=re.DOTALL)
         if match:
             try:
-                return json.loads(match.group(0))
-            except Exception:
+                return _json_loads(match.group(0))
+            except ValueError:
                 pass
 
         # 4) Try finding just the number after "action_index"
         match = re.search(r"['\"]?action_index['\"]?\s*:\s*(\d+)", raw, flags=re.IGNORECASE)
         if match:
-            try:
-                return {"action_index": int(match.group(1))}
-            except Exception:
-                pass
+            return {"action_index": int(match.group(1))}
 
         return None
 
@@ -140,6 +160,28 @@ class LLMJsonAgent:
         """
         Main decision logic with improved error handling.
         """
+        raw = self.chat_fn(self._build_messages(state, legal_actions))
+        return self._action_from_response(raw, state, legal_actions)
+
+    async def decide(self, state: GameState, legal_actions: List[Action]) -> Action:
+        """
+        Non-blocking `choose_action`, so decisions from concurrent games overlap.
+
+        Uses `async_chat_fn` when given, otherwise runs `chat_fn` in a worker
+        thread. `last_decision_info` is set without awaiting in between, so
+        the caller can read it right after this returns even when several
+        games share the agent.
+        """
+        messages = self._build_messages(state, legal_actions)
+        if self.async_chat_fn is not None:
+            raw = await self.async_chat_fn(messages)
+        else:
+            raw = await asyncio.to_thread(self.chat_fn, messages)
+        return self._action_from_response(raw, state, legal_actions)
+
+    def _build_messages(
+        self, state: GameState, legal_actions: List[Action]
+    ) -> List[Dict[str, str]]:
         state_json = self._serialize_state(state)
         action_lines = [self._describe_action(i, a) for i, a in enumerate(legal_actions)]
         actions_text = "\n".join(action_lines)
@@ -218,22 +260,20 @@ Remember: Output ONLY this format: {{"action_index": <number>}}
 Choose the action index that best helps you win the game.
 Consider: Building > Trading with weak players > Bank trades > END_TURN"""
 
-        messages: List[Dict[str, str]] = [
+        return [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ]
 
-        # Call LLM
-        raw = self.chat_fn(messages)
-
+    def _action_from_response(
+        self, raw: str, state: GameState, legal_actions: List[Action]
+    ) -> Action:
         # Check for API failure marker
-        api_failed = False
         try:
-            temp_parse = json.loads(raw)
-            if temp_parse.get("error") == "api_failed":
-                api_failed = True
-        except:
-            pass
+            temp_parse = _json_loads(raw)
+        except ValueError:
+            temp_parse = None
+        api_failed = isinstance(temp_parse, dict) and temp_parse.get("error") == "api_failed"
 
         # Parse response
         used_fallback = False
@@ -249,14 +289,14 @@ Consider: Building > Trading with weak players > Bank trades > END_TURN"""
             if isinstance(idx, int) and 0 <= idx < len(legal_actions):
                 chosen_idx = idx
                 valid_index = True
-                print(f"✓ {self.name} chose action {chosen_idx}: {legal_actions[chosen_idx].type.name}")
+                self._say(f"✓ {self.name} chose action {chosen_idx}: {legal_actions[chosen_idx].type.name}")
             else:
-                print(f"⚠️ {self.name} returned out-of-range index: {idx} (max: {len(legal_actions)-1})")
+                self._say(f"⚠️ {self.name} returned out-of-range index: {idx} (max: {len(legal_actions)-1})")
 
         # Fallback if parsing failed or API failed
         if not valid_index or api_failed:
             used_fallback = True
-            print(f"⚠️ {self.name} using fallback (API failed: {api_failed})")
+            self._say(f"⚠️ {self.name} using fallback (API failed: {api_failed})")
 
             # Smart fallback priority
             # 1) Discard if required
@@ -267,7 +307,7 @@ Consider: Building > Trading with weak players > Bank trades > END_TURN"""
                 ]
                 if discard_indices:
                     chosen_idx = discard_indices[0]
-                    print(f"   → Fallback chose DISCARD action {chosen_idx}")
+                    self._say(f"   → Fallback chose DISCARD action {chosen_idx}")
             
             # 2) Build actions (highest priority)
             if not state.pending_discard:
@@ -277,7 +317,7 @@ Consider: Building > Trading with weak players > Bank trades > END_TURN"""
                 ]
                 if build_indices:
                     chosen_idx = build_indices[0]
-                    print(f"   → Fallback chose BUILD action {chosen_idx}")
+                    self._say(f"   → Fallback chose BUILD action {chosen_idx}")
                 else:
                     # 3) Bank trades
                     bank_indices = [
@@ -286,7 +326,7 @@ Consider: Building > Trading with weak players > Bank trades > END_TURN"""
                     ]
                     if bank_indices:
                         chosen_idx = bank_indices[0]
-                        print(f"   → Fallback chose BANK_TRADE {chosen_idx}")
+                        self._say(f"   → Fallback chose BANK_TRADE {chosen_idx}")
                     else:
                         # 4) END_TURN
                         end_indices = [
@@ -295,14 +335,15 @@ Consider: Building > Trading with weak players > Bank trades > END_TURN"""
                         ]
                         if end_indices:
                             chosen_idx = end_indices[0]
-                            print(f"   → Fallback chose END_TURN {chosen_idx}")
+                            self._say(f"   → Fallback chose END_TURN {chosen_idx}")
 
-        # Safety check
+        # Safety check. A failed API call still plays the fallback action, but
+        # it counts only as an api_error: no reply came back to hallucinate.
         if legal_actions and 0 <= chosen_idx < len(legal_actions):
             self.last_decision_info = StepDecisionInfo(
                 raw_response=raw,
                 valid_index=valid_index and not api_failed,
-                used_fallback=used_fallback or api_failed,
+                used_fallback=used_fallback and not api_failed,
                 api_error=api_failed,
             )
             return legal_actions[chosen_idx]
@@ -312,7 +353,7 @@ Consider: Building > Trading with weak players > Bank trades > END_TURN"""
             self.last_decision_info = StepDecisionInfo(
                 raw_response=raw,
                 valid_index=False,
-                used_fallback=True,
+                used_fallback=not api_failed,
                 api_error=api_failed,
             )
             return Action(ActionType.END_TURN, payload={})
\ No newline at end of file
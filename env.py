@@ -45,7 +45,12 @@ class Player:
         self.knights_played: int = 0
 
     def has_resources(self, cost: Dict[Resource, int]) -> bool:
-        return all(self.resources.get(res, 0) >= amt for res, amt in cost.items())
+        # Plain loop with early exit: no generator frame per affordability check
+        have = self.resources.get
+        for res, amt in cost.items():
+            if have(res, 0) < amt:
+                return False
+        return True
 
     def pay_resources(self, cost: Dict[Resource, int]) -> None:
         for res, amt in cost.items():
@@ -71,6 +76,12 @@ class StubBoard:
         # Allow building on any empty intersection
         return [c for c, b in self.intersections.items() if b is None]
 
+    def get_valid_road_coords(
+        self, player: Player, ensure_connected: bool
+    ) -> List[Tuple[int, int]]:
+        # Any unclaimed path; same rule as assert_valid_road_coords
+        return [p for p, owner in self.paths.items() if owner is None]
+
     def assert_valid_road_coords(
         self, player: Player, path_coords: Tuple[int, int], ensure_connected: bool
     ) -> None:
@@ -163,14 +174,14 @@ PyCatanGame = StubGame
 Coords = int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Action:
     """Discrete game action that the LLM chooses from."""
     type: ActionType
     payload: Dict[str, Any]
 
 
-@dataclass
+@dataclass(slots=True)
 class GameState:
     """Compact snapshot we pass to agents & metrics."""
     turn: int
@@ -231,6 +242,10 @@ CITY_COST = {
     Resource.GRAIN: 2,
 }
 
+# All 36 equally likely 2d6 outcomes; one rng.choice() gives the triangular
+# 2..12 distribution with a single RNG call instead of two randint() calls.
+TWO_DICE_SUMS = tuple(a + b for a in range(1, 7) for b in range(1, 7))
+
 
 class PyCatanEngine(CatanEngine):
     """
@@ -241,6 +256,8 @@ class PyCatanEngine(CatanEngine):
     - Robber mechanic (7 rolls)
     - Discard phase
     - Better hallucination tracking
+
+    `verbose=False` silences the every-10-turns VP progress line.
     """
 
     def __init__(
@@ -249,12 +266,14 @@ class PyCatanEngine(CatanEngine):
         target_vp: int = 10,
         max_turns: int = 500,
         seed: Optional[int] = None,
+        verbose: bool = True,
     ) -> None:
         assert num_players == 4, "This benchmark assumes exactly 4 players."
         self.num_players = num_players
         self.target_vp = target_vp
         self.max_turns = max_turns
         self.rng = random.Random(seed)
+        self.verbose = verbose
         self.game: Optional[PyCatanGame] = None
         self.current_player_index: int = 0
         self.turn: int = 0
@@ -346,7 +365,7 @@ class PyCatanEngine(CatanEngine):
                 print(f"⚠️ Discard failed: {e}")
 
         # Roll dice & distribute resources at the start of each turn
-        roll = self.rng.randint(1, 6) + self.rng.randint(1, 6)
+        roll = self.rng.choice(TWO_DICE_SUMS)
         info["roll"] = roll
         
         # Handle robber (7)
@@ -366,7 +385,7 @@ class PyCatanEngine(CatanEngine):
             self.game.add_yield_for_roll(roll)
         
         # Debug: print progress every 10 turns
-        if self.turn % 10 == 0:
+        if self.verbose and self.turn % 10 == 0:
             vp = [self.game.get_victory_points(p) for p in self.game.players]
             print(f"Turn {self.turn}: VP = {vp}")
 
@@ -456,13 +475,10 @@ class PyCatanEngine(CatanEngine):
             out[res.name.lower()] = player.resources.get(res, 0)
         return out
 
-    def _has_resources(self, player, cost: Dict[Resource, int]) -> bool:
-        return player.has_resources(cost)
-
     def _settlement_actions(self, player) -> List[Action]:
         assert self.game is not None
         actions: List[Action] = []
-        if not self._has_resources(player, SETTLEMENT_COST):
+        if not player.has_resources(SETTLEMENT_COST):
             return actions
 
         for coords in self.game.board.get_valid_settlement_coords(
@@ -479,19 +495,14 @@ class PyCatanEngine(CatanEngine):
     def _road_actions(self, player) -> List[Action]:
         assert self.game is not None
         actions: List[Action] = []
-        if not self._has_resources(player, ROAD_COST):
+        if not player.has_resources(ROAD_COST):
             return actions
 
-        for path_coords in self.game.board.paths.keys():
-            try:
-                self.game.board.assert_valid_road_coords(
-                    player=player,
-                    path_coords=path_coords,
-                    ensure_connected=True,
-                )
-            except Exception:
-                continue
-
+        # Ask the board for buildable paths up front rather than probing every
+        # path with assert_valid_road_coords and using exceptions as control flow
+        for path_coords in self.game.board.get_valid_road_coords(
+            player=player, ensure_connected=True
+        ):
             actions.append(
                 Action(
                     ActionType.BUILD_ROAD,
@@ -504,7 +515,7 @@ class PyCatanEngine(CatanEngine):
     def _city_actions(self, player) -> List[Action]:
         assert self.game is not None
         actions: List[Action] = []
-        if not self._has_resources(player, CITY_COST):
+        if not player.has_resources(CITY_COST):
             return actions
 
         # Upgrade any existing settlement belonging to this player
@@ -534,24 +545,15 @@ class PyCatanEngine(CatanEngine):
 
     def _trade_actions(self, player: Player) -> List[Action]:
         actions: List[Action] = []
+        others = [i for i in range(self.num_players) if i != self.current_player_index]
 
-        # Current player's resources
-        player_res = self._player_resources(self.current_player_index)
-        # Resource types present in this game
-        res_types = [r.name.lower() for r in RESOURCE_LIST]
-
-        # If player has no resources, they can't offer anything
-        if sum(player_res.values()) == 0:
-            return actions
-
-        for give_res in res_types:
-            if player_res.get(give_res, 0) <= 0:
+        # Read the player's hand directly instead of rebuilding a name-keyed copy
+        for res in RESOURCE_LIST:
+            if player.resources.get(res, 0) <= 0:
                 continue  # can't offer what you don't have
 
-            for other_idx in range(self.num_players):
-                if other_idx == self.current_player_index:
-                    continue
-
+            give_res = res.name.lower()
+            for other_idx in others:
                 actions.append(
                     Action(
                         type=ActionType.TRADE,
@@ -567,11 +569,10 @@ class PyCatanEngine(CatanEngine):
     def _bank_trade_actions(self, player: Player) -> List[Action]:
         """4:1 bank trades - trade 4 of one resource for 1 of another."""
         actions: List[Action] = []
-        player_res = self._player_resources(self.current_player_index)
         
         for give_res in RESOURCE_LIST:
             give_name = give_res.name.lower()
-            if player_res.get(give_name, 0) >= 4:
+            if player.resources.get(give_res, 0) >= 4:
                 for get_res in RESOURCE_LIST:
                     if give_res != get_res:
                         get_name = get_res.name.lower()
@@ -642,12 +643,14 @@ class PyCatanEngine(CatanEngine):
 
         res_enum = Resource[res_name.upper()]
         from_player = self.game.players[from_idx]
-        to_player = self.game.players[to_idx]
 
-        # Sanity check (should already be enforced by _trade_actions)
+        # Sanity checks (should already be enforced by _trade_actions)
+        if to_idx == from_idx or not 0 <= to_idx < self.num_players:
+            raise ValueError(f"Player {from_idx} can't trade with player {to_idx}")
         if from_player.resources.get(res_enum, 0) <= 0:
             raise ValueError(f"Player {from_idx} doesn't have {res_name} to trade")
 
+        to_player = self.game.players[to_idx]
         from_player.resources[res_enum] -= 1
         to_player.resources[res_enum] = to_player.resources.get(res_enum, 0) + 1
 
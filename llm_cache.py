@@ -0,0 +1,213 @@
+# llm_cache.py - Persistent prompt -> response cache for the chat fns
+"""
+Exact-match cache for LLM replies, keyed by sha256(model + messages).
+
+Benchmark runs with fixed seeds replay many identical prompts (same opening
+states, same legal-action lists), so a hit skips a 1-3 s API round-trip.
+Entries live in a small sqlite file and expire after a week.
+
+While the cache is on, async chat fns also coalesce identical requests
+that are in flight at the same time (common when concurrent games share a
+seed's opening): the second caller awaits the first caller's API call
+instead of making its own. With the cache off every call samples the model.
+
+Caching is off unless LLM_CACHE_PATH names the cache file (e.g.
+.llm_cache.sqlite3): a benchmark run should sample the models, not replay
+earlier replies, so only turn it on for debugging runs. Set
+LLM_CACHE_FUZZY=1 to also match near-duplicate prompts that differ only in
+the turn counter (see `canonical_messages`).
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any, Callable, Collection, Dict, List, Optional
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_TTL_SECONDS = 7 * 86400
+
+# `"turn": N` line of the state JSON LLMJsonAgent puts in the user prompt
+_TURN_FIELD_RE = re.compile(r'^\s*"turn": \d+,?\n', re.MULTILINE)
+
+
+def canonical_messages(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    Drop the turn counter from prompt text.
+
+    Two decisions with the same hand, scores and legal-action list but a
+    different turn number are the same decision as far as the model is
+    concerned, so they can share a cached reply. Anything that changes the
+    numbered action list still changes the key, so a cached action_index
+    always points at the same action.
+    """
+    return [
+        {**m, "content": _TURN_FIELD_RE.sub("", m.get("content", ""))} for m in messages
+    ]
+
+
+def make_key(model: str, messages: List[Dict[str, str]], fuzzy: bool = False) -> str:
+    if fuzzy:
+        messages = canonical_messages(messages)
+    payload = json.dumps({"model": model, "messages": messages}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """sqlite-backed key -> response store with expiry and per-model hit/miss counts."""
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        fuzzy: bool = False,
+    ) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.fuzzy = fuzzy
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+        self.coalesced: Dict[str, int] = defaultdict(int)
+        # Sync chat fns may run in worker threads (LLMJsonAgent.decide)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+        return self._conn
+
+    def make_key(self, model: str, messages: List[Dict[str, str]]) -> str:
+        return make_key(model, messages, self.fuzzy)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT response, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    def set(self, key: str, response: str) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                (key, response, time.time() + self.ttl_seconds),
+            )
+            conn.commit()
+
+    def record(self, model: str, hit: bool) -> None:
+        if hit:
+            self.hits[model] += 1
+        else:
+            self.misses[model] += 1
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        out: Dict[str, Dict[str, float]] = {}
+        for model in sorted(set(self.hits) | set(self.misses) | set(self.coalesced)):
+            hits = self.hits[model]
+            total = hits + self.misses[model] + self.coalesced[model]
+            out[model] = {
+                "hits": float(hits),
+                "misses": float(self.misses[model]),
+                "coalesced": float(self.coalesced[model]),
+                "hit_rate": hits / total if total else 0.0,
+            }
+        return out
+
+
+_cache: Optional[LLMCache] = None
+# key -> in-flight API call, shared by identical concurrent requests
+_inflight: Dict[str, "asyncio.Task[str]"] = {}
+
+
+def get_cache() -> Optional[LLMCache]:
+    """The process-wide cache, or None unless LLM_CACHE_PATH is set."""
+    global _cache
+    path = os.environ.get("LLM_CACHE_PATH", "")
+    if not path:
+        return None
+    fuzzy = os.environ.get("LLM_CACHE_FUZZY", "") not in ("", "0")
+    if _cache is None or _cache.path != path or _cache.fuzzy != fuzzy:
+        _cache = LLMCache(path, fuzzy=fuzzy)
+    return _cache
+
+
+def cache_stats() -> Dict[str, Dict[str, float]]:
+    """Per-model hits/misses/hit_rate for this process ({} if caching is off)."""
+    cache = get_cache()
+    return cache.stats() if cache is not None else {}
+
+
+def cached_chat(
+    model: str, uncacheable: Collection[str] = ()
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorate a sync or async chat fn with the persistent response cache.
+
+    `uncacheable` lists replies that must not be stored (e.g. the API-failure
+    marker), so a transient outage isn't replayed on later runs.
+    """
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(messages: List[Dict[str, str]]) -> str:
+                cache = get_cache()
+                if cache is None:
+                    return await fn(messages)
+                key = cache.make_key(model, messages)
+                hit = cache.get(key)
+                if hit is not None:
+                    cache.record(model, True)
+                    return hit
+
+                task = _inflight.get(key)
+                if task is not None:
+                    cache.coalesced[model] += 1
+                    # shield: one caller being cancelled mustn't cancel the others
+                    return await asyncio.shield(task)
+
+                cache.record(model, False)
+                task = asyncio.ensure_future(fn(messages))
+                _inflight[key] = task
+                task.add_done_callback(lambda _: _inflight.pop(key, None))
+                text = await asyncio.shield(task)
+                if text not in uncacheable:
+                    cache.set(key, text)
+                return text
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(messages: List[Dict[str, str]]) -> str:
+            cache = get_cache()
+            if cache is None:
+                return fn(messages)
+            key = cache.make_key(model, messages)
+            hit = cache.get(key)
+            cache.record(model, hit is not None)
+            if hit is not None:
+                return hit
+            text = fn(messages)
+            if text not in uncacheable:
+                cache.set(key, text)
+            return text
+
+        return wrapper
+
+    return decorator
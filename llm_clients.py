@@ -1,150 +1,669 @@
 # llm_clients.py - Simplified and fixed
 from __future__ import annotations
 
-from typing import List, Dict
+from typing import (
+    Any,
+    AsyncIterable,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+import asyncio
+import functools
+import itertools
 import json
+import logging
+import random
+import re
+import threading
 import time
 
 import secrets
 
+from llm_cache import cached_chat
+from rate_limit import RateLimiter, estimate_tokens
 
-def openai_chat_fn(messages: List[Dict[str, str]]) -> str:
-    """OpenAI - simplified, no fancy params."""
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; stdlib json parses the same documents
+    _json_loads = json.loads
+
+try:
+    import re2 as _regex  # google-re2: linear-time matching on long noisy replies
+except ImportError:
+    _regex = re
+
+logger = logging.getLogger(__name__)
+
+_FALLBACK_RESPONSE = '{"action_index": 0}'
+# Marker LLMJsonAgent recognises as an API failure (tracked as api_errors)
+_API_FAILED_RESPONSE = '{"error": "api_failed"}'
+
+# Retries on rate limits, timeouts and 5xx: exponential backoff with full jitter.
+# The SDK clients are built with max_retries=0 so this is the only retry layer.
+_RETRIES = 3
+_BACKOFF_BASE = 1.0
+_BACKOFF_CAP = 8.0
+
+# Circuit breaker: consecutive failed calls before pausing a provider, and for how long
+_BREAKER_THRESHOLD = 5
+_BREAKER_COOLDOWN = 30.0
+
+# Connection pools for the shared clients; the async ones serve many
+# concurrent games
+_SYNC_MAX_CONNECTIONS = 64
+_SYNC_MAX_KEEPALIVE = 32
+_ASYNC_MAX_CONNECTIONS = 200
+_ASYNC_MAX_KEEPALIVE = 100
+_HTTP_TIMEOUT = 30.0
+
+_OPENAI_MODEL = "gpt-4o-mini"  # Changed to a model that definitely works
+_CLAUDE_MODEL = "claude-3-5-haiku-20241022"  # Using Haiku 3.5 which is more reliable
+_GEMINI_MODEL = "gemini-2.5-flash"
+
+_MAX_OUTPUT_TOKENS = 100
+
+
+def _api_keys(name: str) -> List[str]:
+    """
+    Keys for one provider: secrets.<name>S if set (a list, used round-robin
+    so each key's rate limit adds up), else the single secrets.<name>.
+    """
+    keys = getattr(secrets, name + "S", None)
+    return list(keys) if keys else [getattr(secrets, name, None)]
+
+
+class _RoundRobin:
+    """Hands out items in turn; safe to share between worker threads."""
+
+    def __init__(self, items: List[Any]) -> None:
+        self._items = itertools.cycle(items)
+        self._lock = threading.Lock()
+
+    def next(self) -> Any:
+        with self._lock:
+            return next(self._items)
+
+
+# Client-side throttles, shared by the sync and async fns of each provider.
+# Defaults sit at entry-tier account limits per key; raise them to match your tier.
+_OPENAI_KEYS = len(_api_keys("OPENAI_API_KEY"))
+_CLAUDE_KEYS = len(_api_keys("ANTHROPIC_API_KEY"))
+_OPENAI_LIMITER = RateLimiter(rpm=500 * _OPENAI_KEYS, tpm=200_000 * _OPENAI_KEYS)
+_CLAUDE_LIMITER = RateLimiter(rpm=50 * _CLAUDE_KEYS, tpm=50_000 * _CLAUDE_KEYS)
+_GEMINI_LIMITER = RateLimiter(rpm=1_000, tpm=1_000_000)
+
+_ACTION_JSON_RE = _regex.compile(r'\{[^}]*"action_index"[^}]*\}')
+_ACTION_INDEX_RE = _regex.compile(r'"action_index"\s*:\s*(\d+)')
+
+
+def _extract_action_json(text: str) -> str:
+    """Return the `{"action_index": N}` JSON carried by a model reply, or the fallback."""
+    if not text:
+        return _FALLBACK_RESPONSE
+
+    # A bare JSON object (the prompt's requested format) needs no regex;
+    # anything else can't parse as one, so don't try
+    text = text.strip()
+    if text[:1] == "{" and text[-1:] == "}":
+        try:
+            _json_loads(text)
+            return text
+        except ValueError:
+            pass
+
+    match = _ACTION_JSON_RE.search(text)
+    if match:
+        return match.group(0)
+    # Sometimes models just return the number
+    match = _ACTION_INDEX_RE.search(text)
+    if match:
+        return f'{{"action_index": {match.group(1)}}}'
+    return _FALLBACK_RESPONSE
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2^attempt))."""
+    return random.uniform(0.0, min(_BACKOFF_CAP, _BACKOFF_BASE * 2 ** attempt))
+
+
+class _CircuitBreaker:
+    """
+    Stops calling a provider that keeps failing.
+
+    After `_BREAKER_THRESHOLD` failed calls in a row the breaker opens and
+    calls fail fast (the agent takes its fallback) for `_BREAKER_COOLDOWN`
+    seconds. The first call after that is a trial (half-open): the others
+    keep failing fast until it reports back; success closes the breaker,
+    another failure reopens it.
+    """
+
+    def __init__(self) -> None:
+        self.failures = 0
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if now < self.open_until:
+                return False
+            if self.failures >= _BREAKER_THRESHOLD:
+                # Half-open: let this caller through as the trial, hold the rest
+                self.open_until = now + _BREAKER_COOLDOWN
+            return True
+
+    def record(self, provider: str, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.failures = 0
+                self.open_until = 0.0
+                return
+            self.failures += 1
+            if self.failures >= _BREAKER_THRESHOLD:
+                self.open_until = time.monotonic() + _BREAKER_COOLDOWN
+                logger.warning(
+                    "%s failed %d times in a row, pausing calls for %.0fs",
+                    provider, self.failures, _BREAKER_COOLDOWN,
+                )
+
+
+_breakers: Dict[str, _CircuitBreaker] = {}
+
+
+def _breaker(provider: str) -> _CircuitBreaker:
+    return _breakers.setdefault(provider, _CircuitBreaker())
+
+
+def _call_with_backoff(
+    provider: str,
+    request: Callable[[], str],
+    retry_errors: Tuple[Type[BaseException], ...],
+    api_errors: Tuple[Type[BaseException], ...],
+    limiter: RateLimiter,
+    tokens: int,
+) -> str:
+    """
+    Run `request`, sleeping and retrying on rate limits and transient errors.
+
+    Every attempt first waits on `limiter` for one request and `tokens`
+    tokens. Any other provider error is logged and reported to the agent as
+    an API failure, as is every call while the provider's circuit breaker is
+    open; everything else (bugs, bad config) propagates.
+    """
+    breaker = _breaker(provider)
+    if not breaker.allow():
+        return _API_FAILED_RESPONSE
+    for attempt in range(_RETRIES + 1):
+        limiter.acquire(tokens)
+        try:
+            text = request()
+            breaker.record(provider, ok=True)
+            return text
+        except retry_errors as e:
+            if attempt == _RETRIES:
+                logger.warning("%s retries exhausted, giving up: %s", provider, e)
+                break
+            delay = _backoff_delay(attempt)
+            logger.warning("%s transient error, retrying in %.1fs: %s", provider, delay, e)
+            time.sleep(delay)
+        except api_errors as e:
+            logger.warning("%s API error: %s", provider, e)
+            break
+    breaker.record(provider, ok=False)
+    return _API_FAILED_RESPONSE
+
+
+async def _acall_with_backoff(
+    provider: str,
+    request: Callable[[], Awaitable[str]],
+    retry_errors: Tuple[Type[BaseException], ...],
+    api_errors: Tuple[Type[BaseException], ...],
+    limiter: RateLimiter,
+    tokens: int,
+) -> str:
+    """Async twin of `_call_with_backoff`; waits without blocking other games."""
+    breaker = _breaker(provider)
+    if not breaker.allow():
+        return _API_FAILED_RESPONSE
+    for attempt in range(_RETRIES + 1):
+        await limiter.acquire_async(tokens)
+        try:
+            text = await request()
+            breaker.record(provider, ok=True)
+            return text
+        except retry_errors as e:
+            if attempt == _RETRIES:
+                logger.warning("%s retries exhausted, giving up: %s", provider, e)
+                break
+            delay = _backoff_delay(attempt)
+            logger.warning("%s transient error, retrying in %.1fs: %s", provider, delay, e)
+            await asyncio.sleep(delay)
+        except api_errors as e:
+            logger.warning("%s API error: %s", provider, e)
+            break
+    breaker.record(provider, ok=False)
+    return _API_FAILED_RESPONSE
+
+
+class _JsonObjectReader:
+    """
+    Accumulate streamed text and report when the first JSON object closes.
+
+    The reply we want is `{"action_index": N}` (a handful of tokens), so there
+    is no point waiting for the model to use up the rest of max_tokens.
+    """
+
+    def __init__(self) -> None:
+        self.parts: List[str] = []
+        self.depth = 0
+
+    def feed(self, piece: Optional[str]) -> bool:
+        """Add a chunk; True once the first `{...}` has been closed."""
+        if not piece:
+            return False
+        self.parts.append(piece)
+        for ch in piece:
+            if ch == "{":
+                self.depth += 1
+            elif ch == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+def _read_first_json_object(pieces: Iterable[Optional[str]]) -> str:
+    reader = _JsonObjectReader()
+    for piece in pieces:
+        if reader.feed(piece):
+            break
+    return reader.text()
+
+
+async def _aread_first_json_object(pieces: AsyncIterable[Optional[str]]) -> str:
+    reader = _JsonObjectReader()
+    async for piece in pieces:
+        if reader.feed(piece):
+            break
+    return reader.text()
+
+
+_async_clients: Dict[str, Tuple[asyncio.AbstractEventLoop, Any]] = {}
+
+
+def _shared_async_client(provider: str, factory: Callable[[], Any]) -> Any:
+    """
+    One async SDK client per provider, shared by every game in the event loop.
+
+    Their httpx connection pools are bound to the loop they were created in,
+    so a new loop (another asyncio.run) gets a fresh client.
+    """
+    loop = asyncio.get_running_loop()
+    cached = _async_clients.get(provider)
+    if cached is None or cached[0] is not loop:
+        cached = (loop, factory())
+        _async_clients[provider] = cached
+    return cached[1]
+
+
+def _async_http_client() -> Any:
+    import httpx
+
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=_ASYNC_MAX_CONNECTIONS,
+            max_keepalive_connections=_ASYNC_MAX_KEEPALIVE,
+        ),
+        timeout=_HTTP_TIMEOUT,
+    )
+
+
+def _sync_http_client() -> Any:
+    import httpx
+
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=_SYNC_MAX_CONNECTIONS,
+            max_keepalive_connections=_SYNC_MAX_KEEPALIVE,
+        ),
+        timeout=_HTTP_TIMEOUT,
+    )
+
+
+# Sync clients are built once and reused, so every decision after the first
+# rides an existing keep-alive connection instead of a new TCP+TLS handshake.
+# Built lazily so a missing SDK only matters for the provider that needs it.
+
+
+@functools.lru_cache(maxsize=None)
+def _openai_clients() -> _RoundRobin:
     try:
-        from openai import OpenAI
+        import openai
     except ImportError as e:
         raise RuntimeError("pip install openai") from e
 
+    return _RoundRobin([
+        openai.OpenAI(api_key=key, http_client=_sync_http_client(), max_retries=0)
+        for key in _api_keys("OPENAI_API_KEY")
+    ])
+
+
+@functools.lru_cache(maxsize=None)
+def _claude_clients() -> _RoundRobin:
     try:
-        client = OpenAI(api_key=secrets.OPENAI_API_KEY)
-        
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",  # Changed to a model that definitely works
-            messages=messages,
-            max_tokens=100,
+        import anthropic
+    except ImportError as e:
+        raise RuntimeError("pip install anthropic") from e
+
+    return _RoundRobin([
+        anthropic.Anthropic(
+            api_key=key, http_client=_sync_http_client(), max_retries=0
         )
-        
-        text = resp.choices[0].message.content
-        if not text:
-            return '{"action_index": 0}'
-        
-        # Try to extract JSON if it's wrapped in text
+        for key in _api_keys("ANTHROPIC_API_KEY")
+    ])
+
+
+def _openai_request_kwargs(messages: List[Dict[str, str]]) -> Dict[str, Any]:
+    return {
+        "model": _OPENAI_MODEL,
+        "messages": messages,
+        "max_tokens": _MAX_OUTPUT_TOKENS,
+        "stream": True,
+    }
+
+
+def _claude_request_kwargs(messages: List[Dict[str, str]]) -> Dict[str, Any]:
+    # Separate system from other messages
+    system_content = None
+    user_messages = []
+
+    for m in messages:
+        if m.get("role") == "system":
+            system_content = m.get("content", "")
+        else:
+            user_messages.append({"role": m["role"], "content": m["content"]})
+
+    kwargs = {
+        "model": _CLAUDE_MODEL,
+        "max_tokens": _MAX_OUTPUT_TOKENS,
+        "messages": user_messages,
+    }
+
+    if system_content:
+        kwargs["system"] = system_content
+    return kwargs
+
+
+@functools.lru_cache(maxsize=None)
+def _configure_gemini() -> None:
+    import google.generativeai as genai
+
+    genai.configure(api_key=secrets.GEMINI_API_KEY)
+
+
+def _new_gemini_model() -> Any:
+    import google.generativeai as genai
+
+    _configure_gemini()
+    return genai.GenerativeModel(_GEMINI_MODEL)
+
+
+@functools.lru_cache(maxsize=None)
+def _gemini_model() -> Any:
+    return _new_gemini_model()
+
+
+def _gemini_prompt(messages: List[Dict[str, str]]) -> str:
+    # Combine messages into one prompt
+    parts = []
+    for m in messages:
+        role = m.get("role", "")
+        content = m.get("content", "")
+        if role == "system":
+            parts.append(f"{content}\n\n")
+        elif role == "user":
+            parts.append(f"{content}\n")
+    return "".join(parts)
+
+
+def _gemini_chunk_text(chunk: Any) -> str:
+    """
+    Text of one streamed Gemini chunk. A chunk with no parts (generation
+    stopped for SAFETY, RECITATION or MAX_TOKENS) raises ValueError from
+    `.text`; it contributes nothing, and the agent falls back as usual.
+    """
+    try:
+        return chunk.text
+    except (AttributeError, ValueError):
+        return ""
+
+
+_ErrorTypes = Tuple[Tuple[Type[BaseException], ...], Tuple[Type[BaseException], ...]]
+
+
+def _openai_errors() -> _ErrorTypes:
+    """(retryable errors, other API errors) for the OpenAI SDK."""
+    import openai
+
+    return (
+        (
+            openai.RateLimitError,
+            openai.APITimeoutError,
+            openai.APIConnectionError,
+            openai.InternalServerError,
+            openai.ConflictError,
+        ),
+        (openai.APIError,),
+    )
+
+
+def _claude_errors() -> _ErrorTypes:
+    """(retryable errors, other API errors) for the Anthropic SDK."""
+    import anthropic
+
+    return (
+        (
+            anthropic.RateLimitError,
+            anthropic.APITimeoutError,
+            anthropic.APIConnectionError,
+            anthropic.InternalServerError,
+            anthropic.ConflictError,
+            # 503/504/529 get their own classes in newer SDK releases
+            *(
+                getattr(anthropic, name)
+                for name in (
+                    "ServiceUnavailableError", "DeadlineExceededError", "OverloadedError"
+                )
+                if hasattr(anthropic, name)
+            ),
+        ),
+        (anthropic.APIError,),
+    )
+
+
+def _gemini_errors() -> _ErrorTypes:
+    """(retryable errors, other API errors) for the Gemini SDK."""
+    import google.generativeai as genai
+    from google.api_core import exceptions as google_exceptions
+
+    return (
+        (
+            google_exceptions.ResourceExhausted,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.DeadlineExceeded,
+            google_exceptions.InternalServerError,
+        ),
+        (
+            google_exceptions.GoogleAPIError,
+            genai.types.BlockedPromptException,
+            genai.types.StopCandidateException,
+        ),
+    )
+
+
+@cached_chat(_OPENAI_MODEL, uncacheable={_API_FAILED_RESPONSE})
+def openai_chat_fn(messages: List[Dict[str, str]]) -> str:
+    """OpenAI - simplified, no fancy params."""
+    client = _openai_clients().next()
+
+    def request() -> str:
+        stream = client.chat.completions.create(**_openai_request_kwargs(messages))
         try:
-            json.loads(text)
-            return text
-        except:
-            import re
-            match = re.search(r'\{[^}]*"action_index"[^}]*\}', text)
-            if match:
-                return match.group(0)
-            return '{"action_index": 0}'
-            
-    except Exception as e:
-        print(f"⚠️ OpenAI error: {e}")
-        return '{"action_index": 0}'
+            text = _read_first_json_object(
+                chunk.choices[0].delta.content for chunk in stream if chunk.choices
+            )
+        finally:
+            stream.close()  # stop generation once we have the object
+
+        return _extract_action_json(text)
 
+    return _call_with_backoff(
+        "OpenAI", request, *_openai_errors(),
+        _OPENAI_LIMITER, estimate_tokens(messages, _MAX_OUTPUT_TOKENS),
+    )
 
+
+@cached_chat(_OPENAI_MODEL, uncacheable={_API_FAILED_RESPONSE})
+async def openai_chat_fn_async(messages: List[Dict[str, str]]) -> str:
+    """OpenAI, non-blocking: lets decisions from concurrent games overlap."""
+    try:
+        import openai
+    except ImportError as e:
+        raise RuntimeError("pip install openai") from e
+
+    client = _shared_async_client(
+        "openai",
+        lambda: _RoundRobin([
+            openai.AsyncOpenAI(
+                api_key=key, http_client=_async_http_client(), max_retries=0
+            )
+            for key in _api_keys("OPENAI_API_KEY")
+        ]),
+    ).next()
+
+    async def request() -> str:
+        stream = await client.chat.completions.create(**_openai_request_kwargs(messages))
+        try:
+            text = await _aread_first_json_object(
+                chunk.choices[0].delta.content async for chunk in stream if chunk.choices
+            )
+        finally:
+            await stream.close()  # stop generation once we have the object
+
+        return _extract_action_json(text)
+
+    return await _acall_with_backoff(
+        "OpenAI", request, *_openai_errors(),
+        _OPENAI_LIMITER, estimate_tokens(messages, _MAX_OUTPUT_TOKENS),
+    )
+
+
+@cached_chat(_CLAUDE_MODEL, uncacheable={_API_FAILED_RESPONSE})
 def claude_chat_fn(messages: List[Dict[str, str]]) -> str:
     """Claude - simplified."""
+    client = _claude_clients().next()
+    kwargs = _claude_request_kwargs(messages)
+
+    def request() -> str:
+        with client.messages.stream(**kwargs) as stream:
+            text = _read_first_json_object(stream.text_stream)
+
+        return _extract_action_json(text)
+
+    return _call_with_backoff(
+        "Claude", request, *_claude_errors(),
+        _CLAUDE_LIMITER, estimate_tokens(messages, _MAX_OUTPUT_TOKENS),
+    )
+
+
+@cached_chat(_CLAUDE_MODEL, uncacheable={_API_FAILED_RESPONSE})
+async def claude_chat_fn_async(messages: List[Dict[str, str]]) -> str:
+    """Claude, non-blocking."""
     try:
         import anthropic
     except ImportError as e:
         raise RuntimeError("pip install anthropic") from e
 
-    try:
-        client = anthropic.Anthropic(api_key=secrets.ANTHROPIC_API_KEY)
-        
-        # Separate system from other messages
-        system_content = None
-        user_messages = []
-        
-        for m in messages:
-            if m.get("role") == "system":
-                system_content = m.get("content", "")
-            else:
-                user_messages.append({"role": m["role"], "content": m["content"]})
-        
-        # Make API call
-        kwargs = {
-            "model": "claude-3-5-haiku-20241022",  # Using Haiku 3.5 which is more reliable
-            "max_tokens": 100,
-            "messages": user_messages,
-        }
-        
-        if system_content:
-            kwargs["system"] = system_content
-        
-        resp = client.messages.create(**kwargs)
-        
-        # Extract text
-        text = ""
-        for block in resp.content:
-            if block.type == "text":
-                text += block.text
-        
-        if not text:
-            return '{"action_index": 0}'
-        
-        # Try to parse or extract JSON
-        try:
-            json.loads(text)
-            return text
-        except:
-            import re
-            match = re.search(r'\{[^}]*"action_index"[^}]*\}', text)
-            if match:
-                return match.group(0)
-            return '{"action_index": 0}'
-            
-    except Exception as e:
-        print(f"⚠️ Claude error: {e}")
-        return '{"action_index": 0}'
+    client = _shared_async_client(
+        "anthropic",
+        lambda: _RoundRobin([
+            anthropic.AsyncAnthropic(
+                api_key=key, http_client=_async_http_client(), max_retries=0
+            )
+            for key in _api_keys("ANTHROPIC_API_KEY")
+        ]),
+    ).next()
+    kwargs = _claude_request_kwargs(messages)
 
+    async def request() -> str:
+        async with client.messages.stream(**kwargs) as stream:
+            text = await _aread_first_json_object(stream.text_stream)
 
+        return _extract_action_json(text)
+
+    return await _acall_with_backoff(
+        "Claude", request, *_claude_errors(),
+        _CLAUDE_LIMITER, estimate_tokens(messages, _MAX_OUTPUT_TOKENS),
+    )
+
+
+@cached_chat(_GEMINI_MODEL, uncacheable={_API_FAILED_RESPONSE})
 def gemini_chat_fn(messages: List[Dict[str, str]]) -> str:
     """Gemini - simplified."""
     try:
-        import google.generativeai as genai
+        retry_errors, api_errors = _gemini_errors()
     except ImportError as e:
         raise RuntimeError("pip install google-generativeai") from e
 
+    model = _gemini_model()
+    prompt = _gemini_prompt(messages)
+
+    def request() -> str:
+        resp = model.generate_content(prompt, stream=True)
+
+        text = _read_first_json_object(_gemini_chunk_text(chunk) for chunk in resp)
+
+        return _extract_action_json(text)
+
+    return _call_with_backoff(
+        "Gemini", request, retry_errors, api_errors,
+        _GEMINI_LIMITER, estimate_tokens(messages),
+    )
+
+
+@cached_chat(_GEMINI_MODEL, uncacheable={_API_FAILED_RESPONSE})
+async def gemini_chat_fn_async(messages: List[Dict[str, str]]) -> str:
+    """Gemini, non-blocking."""
     try:
-        genai.configure(api_key=secrets.GEMINI_API_KEY)
-        
-        model = genai.GenerativeModel("gemini-2.5-flash")  # Using 1.5 which is stable
-        
-        # Combine messages into one prompt
-        prompt = ""
-        for m in messages:
-            role = m.get("role", "")
-            content = m.get("content", "")
-            if role == "system":
-                prompt += f"{content}\n\n"
-            elif role == "user":
-                prompt += f"{content}\n"
-        
-        resp = model.generate_content(prompt)
-        
-        text = resp.text if hasattr(resp, 'text') else ""
-        
-        if not text:
-            return '{"action_index": 0}'
-        
-        # Try to parse or extract JSON
-        try:
-            json.loads(text)
-            return text
-        except:
-            import re
-            match = re.search(r'\{[^}]*"action_index"[^}]*\}', text)
-            if match:
-                return match.group(0)
-            # Sometimes Gemini just returns a number
-            match = re.search(r'"action_index"\s*:\s*(\d+)', text)
-            if match:
-                return f'{{"action_index": {match.group(1)}}}'
-            return '{"action_index": 0}'
-            
-    except Exception as e:
-        print(f"⚠️ Gemini error: {e}")
-        return '{"action_index": 0}'
\ No newline at end of file
+        retry_errors, api_errors = _gemini_errors()
+    except ImportError as e:
+        raise RuntimeError("pip install google-generativeai") from e
+
+    # Its async transport is tied to the event loop, like the other async clients
+    model = _shared_async_client("gemini", _new_gemini_model)
+    prompt = _gemini_prompt(messages)
+
+    async def request() -> str:
+        resp = await model.generate_content_async(prompt, stream=True)
+
+        text = await _aread_first_json_object(
+            _gemini_chunk_text(chunk) async for chunk in resp
+        )
+
+        return _extract_action_json(text)
+
+    return await _acall_with_backoff(
+        "Gemini", request, retry_errors, api_errors,
+        _GEMINI_LIMITER, estimate_tokens(messages),
+    )
@@ -1,29 +1,31 @@
 # main.py - Enhanced benchmark with better configuration
 from __future__ import annotations
 
-import json
-from datetime import datetime
-from typing import List, Dict, Any
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple
 
-from env import PyCatanEngine
 from agents import LLMJsonAgent, RandomAgent
-from orchestrator import GameOrchestrator
-from metrics import (
-    compute_win_rates,
-    hallucination_stats,
-    trade_behavior,
-    resource_efficiency,
-    overall_scores,
-    average_turns,
+from orchestrator import GameOrchestrator, GameResult
+from runner import (
+    BASE_SEED,
+    make_engine_factory,
+    run_and_report,
+    # Still importable from main for existing analysis scripts
+    print_results,
+    save_results_to_json,
 )
 from llm_clients import (
     openai_chat_fn,
     claude_chat_fn,
     gemini_chat_fn,
+    openai_chat_fn_async,
+    claude_chat_fn_async,
+    gemini_chat_fn_async,
 )
 
 
-def build_agents():
+def build_agents(use_remote_llms: bool = True, seed: int = 42, verbose: bool = True):
     """
     3 LLM agents + 1 random baseline.
     
@@ -31,154 +33,29 @@ def build_agents():
     Player 1: Claude (Haiku 4.5) - Cheapest Claude model
     Player 2: Gemini (2.5 Flash)
     Player 3: Random baseline
+
+    With use_remote_llms=False all four players are random agents (offline
+    run: no API keys needed, exercises the engine and metrics only).
+    verbose=False silences the LLM agents' per-decision lines.
     """
+    if not use_remote_llms:
+        return [RandomAgent(f"Random_{i}", seed=seed + i) for i in range(4)]
     return [
-        LLMJsonAgent("OpenAI_gpt-5-nano", openai_chat_fn),
-        LLMJsonAgent("Claude_Haiku_4.5", claude_chat_fn),
-        LLMJsonAgent("Gemini_2.5_Flash", gemini_chat_fn),
-        RandomAgent("Random_baseline", seed=42),
+        LLMJsonAgent("OpenAI_gpt-5-nano", openai_chat_fn, openai_chat_fn_async, verbose),
+        LLMJsonAgent("Claude_Haiku_4.5", claude_chat_fn, claude_chat_fn_async, verbose),
+        LLMJsonAgent("Gemini_2.5_Flash", gemini_chat_fn, gemini_chat_fn_async, verbose),
+        RandomAgent("Random_baseline", seed=seed),
     ]
 
 
-def save_results_to_json(results, metrics, filename=None):
-    """Save results to JSON for analysis."""
-    if filename is None:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"game_results_{timestamp}.json"
-
-    serializable_results = []
-    for game_idx, game in enumerate(results):
-        game_data = {
-            "game_index": game_idx,
-            "winner_index": game.winner_index,
-            "final_turn": game.final_state.turn,
-            "final_victory_points": game.final_state.victory_points,
-            "final_resources": game.final_state.resources,
-            "steps": []
-        }
-
-        for step in game.steps:
-            step_data = {
-                "turn": step.state_before.turn,
-                "acting_player": step.acting_player_index,
-                "action_type": step.action.type.name,
-                "action_payload": str(step.action.payload),
-                "legal_actions_count": step.legal_actions_count,
-                "victory_points_before": step.state_before.victory_points,
-                "victory_points_after": step.state_after.victory_points,
-                "info": {
-                    k: v for k, v in step.info.items()
-                    if k not in ["raw_llm_response"]  # Exclude large text
-                },
-            }
-
-            # Add LLM-specific tracking
-            if "llm_valid_index" in step.info:
-                step_data["llm_valid_index"] = step.info["llm_valid_index"]
-                step_data["llm_used_fallback"] = step.info["llm_used_fallback"]
-                step_data["llm_api_error"] = step.info.get("llm_api_error", False)
-            
-            if "action_failed" in step.info:
-                step_data["action_failed"] = step.info["action_failed"]
-
-            game_data["steps"].append(step_data)
-
-        serializable_results.append(game_data)
-
-    output = {
-        "timestamp": datetime.now().isoformat(),
-        "num_games": len(results),
-        "metrics": metrics,
-        "games": serializable_results,
-    }
-
-    with open(filename, "w") as f:
-        json.dump(output, f, indent=2)
-
-    print(f"\n💾 Results saved to: {filename}")
-    return filename
-
-
-def print_results(results, agents):
-    """Print formatted results."""
-    avg_t = average_turns(results)
-    win_rates = compute_win_rates(results)
-    hall = hallucination_stats(results)
-    trades = trade_behavior(results)
-    efficiency = resource_efficiency(results)
-    scores = overall_scores(results)
-
-    agent_names = [a.name for a in agents]
-
-    print("\n" + "=" * 70)
-    print("BENCHMARK RESULTS")
-    print("=" * 70)
-
-    print(f"\n📊 Games Completed: {len(results)}")
-    print(f"📈 Average Turns: {avg_t:.1f}")
-
-    print("\n🏆 WIN RATES")
-    print("-" * 70)
-    for i, rate in sorted(win_rates.items(), key=lambda x: x[1], reverse=True):
-        bar = "█" * int(rate * 50)
-        print(f"{agent_names[i]:<25} {rate:>6.1%} {bar}")
-
-    print("\n🧠 HALLUCINATION ANALYSIS")
-    print("-" * 70)
-    for i, st in hall.items():
-        print(f"\n{agent_names[i]} (Player {i}):")
-        print(f"  Total decisions:     {st['decisions']:>6.0f}")
-        print(f"  Index errors:        {st['index_hallucinations']:>6.0f}")
-        print(f"  Action failures:     {st['action_failures']:>6.0f}")
-        print(f"  Total hallucinations: {st['total_hallucinations']:>6.0f}")
-        print(f"  Hallucination rate:  {st['hallucination_rate']:>6.1%}")
-        print(f"  Penalty score:       {st['hallucination_penalty_score']:>6.3f}")
-
-    print("\n💰 TRADE BEHAVIOR")
-    print("-" * 70)
-    for i, st in trades.items():
-        print(f"\n{agent_names[i]} (Player {i}):")
-        print(f"  Player trades:       {st['num_player_trades']:>6.0f}")
-        print(f"  Bank trades:         {st['num_bank_trades']:>6.0f}")
-        print(f"  Total trades:        {st['total_trades']:>6.0f}")
-        if st['total_trades'] > 0:
-            print(f"  Helping leader:      {st['trades_helping_leader_ratio']:>6.1%}")
-            print(f"  Helping last place:  {st['trades_helping_last_ratio']:>6.1%}")
-
-    print("\n⚡ RESOURCE EFFICIENCY")
-    print("-" * 70)
-    for i, st in efficiency.items():
-        print(f"\n{agent_names[i]} (Player {i}):")
-        print(f"  Build rate:          {st['build_rate']:>6.3f} builds/turn")
-        print(f"  Avg final resources: {st['avg_final_resources']:>6.1f} cards")
-        print(f"  Efficiency score:    {st['efficiency_score']:>6.3f}")
-
-    print("\n🎯 OVERALL SCORES")
-    print("-" * 70)
-    print("Formula: win_rate × hallucination_penalty × (0.5 + 0.3×trade_activity + 0.2×game_sense)")
-    print("  • Base: 50% credit for winning")
-    print("  • Trade activity: +30% for active trading (max 15 trades)")
-    print("  • Game sense: +20% for strategic play (help weak, avoid helping leader)")
-    print()
-    sorted_scores = sorted(scores.items(), key=lambda x: x[1]['overall_score'], reverse=True)
-    for i, st in sorted_scores:
-        print(f"\n{agent_names[i]} (Player {i}):")
-        print(f"  Win rate:            {st['win_rate']:>6.1%}")
-        print(f"  Overall score:       {st['overall_score']:>6.3f} ⭐")
-        print(f"  Game sense:          {st['game_sense']:>6.3f}")
-        print(f"  Trade activity:      {st['trade_activity']:>6.3f}")
-
-    print("\n" + "=" * 70)
-
-    # Return metrics for saving
-    return {
-        "average_turns": avg_t,
-        "win_rates": {f"player_{i}": rate for i, rate in win_rates.items()},
-        "hallucination_stats": {f"player_{i}": st for i, st in hall.items()},
-        "trade_behavior": {f"player_{i}": st for i, st in trades.items()},
-        "resource_efficiency": {f"player_{i}": st for i, st in efficiency.items()},
-        "overall_scores": {f"player_{i}": st for i, st in scores.items()},
-    }
+def _play_offline_game(args: Tuple[int, int, int, bool]) -> GameResult:
+    """One offline game, self-contained so it can run in a worker process."""
+    game_num, target_vp, max_turns, verbose = args
+    engine = make_engine_factory(target_vp, max_turns, verbose)(game_num)
+    agents = build_agents(use_remote_llms=False, seed=BASE_SEED + 4 * game_num)
+    result = GameOrchestrator(engine, agents, verbose=verbose).play_single_game()
+    result.game_index = game_num
+    return result
 
 
 def main():
@@ -186,6 +63,13 @@ def main():
     N_GAMES = 5  # Start with 5 games for testing
     TARGET_VP = 8  # Lower target for faster games
     MAX_TURNS = 150  # Safety net
+    # Games in flight at once (0 = all of them); lower it if you hit rate limits
+    MAX_CONCURRENCY = int(os.environ.get("MAX_CONCURRENCY", "0"))
+    # USE_REMOTE_LLMS=0: random agents only, games spread over N_WORKERS processes
+    USE_REMOTE_LLMS = os.environ.get("USE_REMOTE_LLMS", "1") != "0"
+    N_WORKERS = int(os.environ.get("N_WORKERS", "0")) or os.cpu_count() or 1
+    # VERBOSE=0: no per-decision, per-turn or per-game progress lines
+    VERBOSE = os.environ.get("VERBOSE", "1") != "0"
 
     print("=" * 70)
     print("🎮 CATAN LLM BENCHMARK v2.1")
@@ -194,11 +78,18 @@ def main():
     print(f"  Games:         {N_GAMES}")
     print(f"  Victory Points: {TARGET_VP}")
     print(f"  Max Turns:     {MAX_TURNS}")
+    if USE_REMOTE_LLMS:
+        print(f"  Concurrency:   {MAX_CONCURRENCY or 'all games'}")
+    else:
+        print(f"  Offline:       random agents, {N_WORKERS} worker processes")
     print("\n🤖 Models:")
-    print("  • OpenAI gpt-5-nano")
-    print("  • Claude Haiku 4.5 (cheapest)")
-    print("  • Gemini 2.5 Flash")
-    print("  • Random Baseline")
+    if USE_REMOTE_LLMS:
+        print("  • OpenAI gpt-5-nano")
+        print("  • Claude Haiku 4.5 (cheapest)")
+        print("  • Gemini 2.5 Flash")
+        print("  • Random Baseline")
+    else:
+        print("  • 4 × Random agents (offline)")
     print("\n✨ Features:")
     print("  ✓ Retry logic with exponential backoff")
     print("  ✓ Enhanced JSON parsing")
@@ -206,6 +97,7 @@ def main():
     print("  ✓ Bank trades (4:1)")
     print("  ✓ Robber mechanic")
     print("  ✓ Discard phase")
+    print("  ✓ Concurrent games (async LLM calls)")
     print("\n🔜 TODO (from README):")
     print("  • Port trades (3:1, 2:1)")
     print("  • Proper hex board")
@@ -213,30 +105,30 @@ def main():
     print("  • Strategy pivot detection")
     print("=" * 70)
 
-    # Setup
-    engine = PyCatanEngine(
-        num_players=4,
-        target_vp=TARGET_VP,
-        max_turns=MAX_TURNS,
-        seed=42,
-    )
-
-    agents = build_agents()
-    orchestrator = GameOrchestrator(engine, agents)
+    agents = build_agents(USE_REMOTE_LLMS, verbose=VERBOSE)
 
-    # Run games
+    # Run games, then print, compute and save the report once
     print("\n🎲 Starting games...\n")
-    results = orchestrator.play_many_games(n_games=N_GAMES)
-
-    # Display results
-    metrics = print_results(results, agents)
-
-    # Save to JSON
-    save_results_to_json(results, metrics)
+    results = None
+    if not USE_REMOTE_LLMS:
+        # No network waits offline: games are CPU-bound, so use every core
+        with ProcessPoolExecutor(max_workers=N_WORKERS) as pool:
+            results = list(pool.map(
+                _play_offline_game,
+                [(game_num, TARGET_VP, MAX_TURNS, VERBOSE) for game_num in range(N_GAMES)],
+            ))
+    run_and_report(
+        agents,
+        make_engine_factory(TARGET_VP, MAX_TURNS, VERBOSE),
+        N_GAMES,
+        max_concurrency=MAX_CONCURRENCY,
+        results=results,
+        verbose=VERBOSE,
+    )
 
     print("\n✅ Benchmark complete!")
     print("\n💡 NEXT STEPS:")
-    print("  1. Review game_results_*.json for detailed analysis")
+    print("  1. Review game_results_*.ndjson (one game per line) and *_metrics.json")
     print("  2. Check hallucination rates - should be <10%")
     print("  3. If API errors persist, increase retry delays")
     print("  4. Implement port trades for better gameplay")
@@ -9,12 +9,18 @@ Usage:
     python main_single_model.py gemini
 """
 
+import os
 import sys
-from env import PyCatanEngine
 from agents import LLMJsonAgent, RandomAgent
-from orchestrator import GameOrchestrator
-from metrics import compute_win_rates, hallucination_stats, average_turns
-from llm_clients import openai_chat_fn, claude_chat_fn, gemini_chat_fn
+from runner import compute_metrics, make_engine_factory, run_games
+from llm_clients import (
+    openai_chat_fn,
+    claude_chat_fn,
+    gemini_chat_fn,
+    openai_chat_fn_async,
+    claude_chat_fn_async,
+    gemini_chat_fn_async,
+)
 
 
 def main():
@@ -30,12 +36,15 @@ def main():
     if model_choice == "openai":
         llm_name = "OpenAI_gpt-5-nano"
         chat_fn = openai_chat_fn
+        async_chat_fn = openai_chat_fn_async
     elif model_choice == "claude":
         llm_name = "Claude_Haiku_4.5"
         chat_fn = claude_chat_fn
+        async_chat_fn = claude_chat_fn_async
     elif model_choice == "gemini":
         llm_name = "Gemini_2.5_Flash"
         chat_fn = gemini_chat_fn
+        async_chat_fn = gemini_chat_fn_async
     else:
         print(f"Unknown model: {model_choice}")
         print("Choose: openai, claude, or gemini")
@@ -45,6 +54,8 @@ def main():
     N_GAMES = 3
     TARGET_VP = 8
     MAX_TURNS = 150
+    MAX_CONCURRENCY = int(os.environ.get("MAX_CONCURRENCY", "0"))  # 0 = all games
+    VERBOSE = os.environ.get("VERBOSE", "1") != "0"  # 0 = no progress lines
     
     print("=" * 70)
     print("🎮 SIMPLIFIED CATAN TEST")
@@ -62,30 +73,27 @@ def main():
     
     # Build agents: 1 LLM + 3 random
     agents = [
-        LLMJsonAgent(llm_name, chat_fn),
+        LLMJsonAgent(llm_name, chat_fn, async_chat_fn, verbose=VERBOSE),
         RandomAgent("Random_1", seed=42),
         RandomAgent("Random_2", seed=43),
         RandomAgent("Random_3", seed=44),
     ]
     
-    # Setup engine
-    engine = PyCatanEngine(
-        num_players=4,
-        target_vp=TARGET_VP,
-        max_turns=MAX_TURNS,
-        seed=42,
-    )
-    
-    orchestrator = GameOrchestrator(engine, agents)
-    
     # Run games
     print("🎲 Starting games...\n")
-    results = orchestrator.play_many_games(n_games=N_GAMES)
+    results = run_games(
+        agents,
+        make_engine_factory(TARGET_VP, MAX_TURNS, VERBOSE),
+        N_GAMES,
+        MAX_CONCURRENCY,
+        verbose=VERBOSE,
+    )
     
     # Basic metrics
-    avg_t = average_turns(results)
-    win_rates = compute_win_rates(results)
-    hall = hallucination_stats(results)
+    metrics = compute_metrics(results)
+    avg_t = metrics["average_turns"]
+    win_rates = metrics["win_rates"]
+    hall = metrics["hallucination_stats"]
     
     # Print results
     print("\n" + "=" * 70)
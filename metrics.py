@@ -1,12 +1,138 @@
 # metrics.py - Fixed scoring and added formula documentation
 from __future__ import annotations
 
-from collections import defaultdict
-from typing import Dict, List
+from typing import Any, Dict, List, Tuple
 
-from orchestrator import GameResult
+from orchestrator import GameResult, StepRecord
 from env import ActionType
 
+# Players per game (the orchestrator requires exactly 4)
+NUM_PLAYERS = 4
+
+# Columns of a player's row in _StepTotals.trades
+_WITH_LEADER = 0     # leader on either side of the trade
+_HELPING_LEADER = 1  # leader received cards
+_HELPING_LAST = 2    # last place received cards
+_SELFISH = 3         # proposer gained more than the partner
+_ALTRUISTIC = 4      # partner gained more than the proposer
+_NUM_TRADE_COLS = 5
+
+
+class _StepTotals:
+    """Raw per-player counts behind hallucination, trade and efficiency metrics."""
+
+    def __init__(self) -> None:
+        self.num_games = 0
+        # Decision-quality counts, indexed by player
+        self.decisions = [0] * NUM_PLAYERS
+        self.fallbacks = [0] * NUM_PLAYERS
+        self.action_failures = [0] * NUM_PLAYERS
+        self.api_errors = [0] * NUM_PLAYERS
+        # Action counts, indexed by player
+        self.builds = [0] * NUM_PLAYERS
+        self.bank_trades = [0] * NUM_PLAYERS
+        self.player_trades = [0] * NUM_PLAYERS
+        # Player-trade breakdown: one row per player, _WITH_LEADER.. columns
+        self.trades = [[0] * _NUM_TRADE_COLS for _ in range(NUM_PLAYERS)]
+        # Cards held at game end, summed over games, indexed by player
+        self.final_resources = [0] * NUM_PLAYERS
+
+
+def _aggregate(results: List[GameResult]) -> _StepTotals:
+    """
+    Count everything the per-step metrics need in one walk over all steps,
+    instead of one walk per metric.
+    """
+    totals = _StepTotals()
+    totals.num_games = len(results)
+    decisions = totals.decisions
+    fallbacks = totals.fallbacks
+    action_failures = totals.action_failures
+    api_errors = totals.api_errors
+    trades = totals.trades
+    final_resources_total = totals.final_resources
+    TRADE = ActionType.TRADE
+    # Action type -> per-player counter: one lookup instead of a chain of
+    # comparisons, and a miss for the common END_TURN/DISCARD steps
+    counters = {
+        ActionType.BUILD_SETTLEMENT: totals.builds,
+        ActionType.BUILD_CITY: totals.builds,
+        ActionType.BUILD_ROAD: totals.builds,
+        ActionType.BANK_TRADE: totals.bank_trades,
+        TRADE: totals.player_trades,
+    }
+    counter_for = counters.get
+    count_player_trade = _count_player_trade
+
+    for g in results:
+        for step in g.steps:
+            i = step.acting_player_index
+            action_type = step.action.type
+
+            decisions[i] += 1
+
+            # Track parsing failures, action failures and API errors
+            if step.used_fallback:
+                fallbacks[i] += 1
+            if step.action_failed:
+                action_failures[i] += 1
+            if step.api_error:
+                api_errors[i] += 1
+
+            counts = counter_for(action_type)
+            if counts is not None:
+                counts[i] += 1
+                if action_type is TRADE:
+                    count_player_trade(trades[i], step)
+
+        # Final resources
+        for i, cards in enumerate(g.final_resource_totals):
+            final_resources_total[i] += cards
+
+    return totals
+
+
+def _count_player_trade(row: List[int], step: StepRecord) -> None:
+    from_idx = step.acting_player_index
+    to_idx = int(step.action.payload["to_player"])
+    before = step.state_before
+
+    # Leader/last place before the trade (first player on ties)
+    vp = before.victory_points
+    leader = vp.index(max(vp))
+    last = vp.index(min(vp))
+
+    # Resource deltas
+    before_res = before.resources
+    after_res = step.state_after.resources
+    from_delta = sum(after_res[from_idx].values()) - sum(before_res[from_idx].values())
+    to_delta = sum(after_res[to_idx].values()) - sum(before_res[to_idx].values())
+
+    if to_idx == leader or from_idx == leader:
+        row[_WITH_LEADER] += 1
+
+    if to_idx == leader and to_delta > 0:
+        row[_HELPING_LEADER] += 1
+
+    if to_idx == last and to_delta > 0:
+        row[_HELPING_LAST] += 1
+
+    if from_delta > to_delta:
+        row[_SELFISH] += 1
+    elif from_delta < to_delta:
+        row[_ALTRUISTIC] += 1
+
+
+def _game_outcomes(results: List[GameResult]) -> Tuple[List[int], int]:
+    """(wins per player, total turns) in one walk over the games."""
+    wins = [0] * NUM_PLAYERS
+    total_turns = 0
+    for g in results:
+        if g.winner_index is not None:
+            wins[g.winner_index] += 1
+        total_turns += g.final_state.turn
+    return wins, total_turns
+
 
 def compute_win_rates(results: List[GameResult]) -> Dict[int, float]:
     """
@@ -14,19 +140,21 @@ def compute_win_rates(results: List[GameResult]) -> Dict[int, float]:
     
     Formula: wins / total_games
     """
-    wins = defaultdict(int)
-    for g in results:
-        if g.winner_index is not None:
-            wins[g.winner_index] += 1
-    total = len(results) or 1
-    return {i: wins[i] / total for i in range(4)}
+    wins, _ = _game_outcomes(results)
+    return _win_rates(wins, len(results))
+
+
+def _win_rates(wins: List[int], num_games: int) -> Dict[int, float]:
+    total = num_games or 1
+    return {i: wins[i] / total for i in range(NUM_PLAYERS)}
 
 
 def average_turns(results: List[GameResult]) -> float:
     """Calculate average game length in turns."""
     if not results:
         return 0.0
-    return sum(g.final_state.turn for g in results) / len(results)
+    _, total_turns = _game_outcomes(results)
+    return total_turns / len(results)
 
 
 def hallucination_stats(results: List[GameResult]) -> Dict[int, Dict[str, float]]:
@@ -34,7 +162,8 @@ def hallucination_stats(results: List[GameResult]) -> Dict[int, Dict[str, float]
     Track decision quality:
     - Index parsing failures (invalid action_index)
     - Action execution failures (illegal moves)
-    - API errors (timeout/failure)
+    - API errors (timeout/failure) - counted on their own, not as hallucinations;
+      hallucination_rate is taken over the decisions that got a reply
     
     Penalty Formula:
       penalty_score = max(0, 1 - 5 * hallucination_rate)
@@ -42,42 +171,20 @@ def hallucination_stats(results: List[GameResult]) -> Dict[int, Dict[str, float]
       - 10% hallucinations → 0.5 penalty score (50% penalty)
       - 20% hallucinations → 0.0 penalty score (maximum penalty)
     """
-    stats = {
-        i: {
-            "total_decisions": 0,
-            "fallbacks": 0,
-            "action_failures": 0,
-            "api_errors": 0,
-        }
-        for i in range(4)
-    }
+    return _hallucination_scores(_aggregate(results))
 
-    for g in results:
-        for step in g.steps:
-            i = step.acting_player_index
-            stats[i]["total_decisions"] += 1
-            
-            # Track parsing failures
-            if step.info.get("llm_used_fallback", False):
-                stats[i]["fallbacks"] += 1
-            
-            # Track action failures
-            if step.info.get("action_failed", False):
-                stats[i]["action_failures"] += 1
-            
-            # Track API errors
-            if step.info.get("llm_api_error", False):
-                stats[i]["api_errors"] += 1
 
+def _hallucination_scores(totals: _StepTotals) -> Dict[int, Dict[str, float]]:
     out: Dict[int, Dict[str, float]] = {}
-    for i in range(4):
-        total = stats[i]["total_decisions"] or 1
-        fallbacks = stats[i]["fallbacks"]
-        failures = stats[i]["action_failures"]
-        api_errors = stats[i]["api_errors"]
+    for i in range(NUM_PLAYERS):
+        total = totals.decisions[i] or 1
+        fallbacks = totals.fallbacks[i]
+        failures = totals.action_failures[i]
+        api_errors = totals.api_errors[i]
+        answered = totals.decisions[i] - api_errors or 1
         
         total_hallucinations = fallbacks + failures
-        rate = total_hallucinations / total
+        rate = total_hallucinations / answered
         
         # Penalty: after 20% hallucination, score drops to 0
         penalty_score = max(0.0, 1.0 - 5.0 * rate)
@@ -94,11 +201,6 @@ def hallucination_stats(results: List[GameResult]) -> Dict[int, Dict[str, float]
     return out
 
 
-def _sum_resources(res_dict: Dict[str, int]) -> int:
-    """Sum all resources in a dict."""
-    return sum(res_dict.values())
-
-
 def trade_behavior(results: List[GameResult]) -> Dict[int, Dict[str, float]]:
     """
     Analyze trading patterns.
@@ -111,91 +213,29 @@ def trade_behavior(results: List[GameResult]) -> Dict[int, Dict[str, float]]:
     - selfish_trade_ratio: % where you gain more than partner
     - altruistic_trade_ratio: % where partner gains more than you
     """
-    trade_counts = {
-        i: {
-            "num_player_trades": 0,
-            "num_bank_trades": 0,
-            "num_trades_with_leader": 0,
-            "num_trades_helping_leader": 0,
-            "num_trades_helping_last": 0,
-            "selfish_trades": 0,
-            "altruistic_trades": 0,
-        }
-        for i in range(4)
-    }
+    return _trade_ratios(_aggregate(results))
 
-    for g in results:
-        for step in g.steps:
-            from_idx = step.acting_player_index
-            
-            # Bank trades
-            if step.action.type == ActionType.BANK_TRADE:
-                trade_counts[from_idx]["num_bank_trades"] += 1
-                continue
-            
-            # Player trades
-            if step.action.type != ActionType.TRADE:
-                continue
-
-            trade_counts[from_idx]["num_player_trades"] += 1
-            
-            payload = step.action.payload
-            to_idx = int(payload["to_player"])
-
-            # Determine leader/last place before trade
-            vp = step.state_before.victory_points
-            max_vp = max(vp)
-            min_vp = min(vp)
-            leaders = [i for i, v in enumerate(vp) if v == max_vp]
-            lasts = [i for i, v in enumerate(vp) if v == min_vp]
-            leader = leaders[0]
-            last = lasts[0]
-
-            # Resource deltas
-            before_res = step.state_before.resources
-            after_res = step.state_after.resources
-
-            from_before = _sum_resources(before_res[from_idx])
-            from_after = _sum_resources(after_res[from_idx])
-            to_before = _sum_resources(before_res[to_idx])
-            to_after = _sum_resources(after_res[to_idx])
-
-            from_delta = from_after - from_before
-            to_delta = to_after - to_before
-
-            stats = trade_counts[from_idx]
-
-            if to_idx == leader or from_idx == leader:
-                stats["num_trades_with_leader"] += 1
-
-            if to_idx == leader and to_delta > 0:
-                stats["num_trades_helping_leader"] += 1
-
-            if to_idx == last and to_delta > 0:
-                stats["num_trades_helping_last"] += 1
-
-            if from_delta > to_delta:
-                stats["selfish_trades"] += 1
-            elif from_delta < to_delta:
-                stats["altruistic_trades"] += 1
 
+def _trade_ratios(totals: _StepTotals) -> Dict[int, Dict[str, float]]:
     # Normalize
     out: Dict[int, Dict[str, float]] = {}
-    for i in range(4):
-        s = trade_counts[i]
-        total_player = s["num_player_trades"] or 1
-        total_trades = s["num_player_trades"] + s["num_bank_trades"]
-        selfish_plus_altru = s["selfish_trades"] + s["altruistic_trades"] or 1
+    for i in range(NUM_PLAYERS):
+        row = totals.trades[i]
+        player_trades = totals.player_trades[i]
+        bank_trades = totals.bank_trades[i]
+        total_player = player_trades or 1
+        total_trades = player_trades + bank_trades
+        selfish_plus_altru = row[_SELFISH] + row[_ALTRUISTIC] or 1
 
         out[i] = {
-            "num_player_trades": float(s["num_player_trades"]),
-            "num_bank_trades": float(s["num_bank_trades"]),
+            "num_player_trades": float(player_trades),
+            "num_bank_trades": float(bank_trades),
             "total_trades": float(total_trades),
-            "trades_with_leader_ratio": s["num_trades_with_leader"] / total_player,
-            "trades_helping_leader_ratio": s["num_trades_helping_leader"] / total_player,
-            "trades_helping_last_ratio": s["num_trades_helping_last"] / total_player,
-            "selfish_trade_ratio": s["selfish_trades"] / selfish_plus_altru,
-            "altruistic_trade_ratio": s["altruistic_trades"] / selfish_plus_altru,
+            "trades_with_leader_ratio": row[_WITH_LEADER] / total_player,
+            "trades_helping_leader_ratio": row[_HELPING_LEADER] / total_player,
+            "trades_helping_last_ratio": row[_HELPING_LAST] / total_player,
+            "selfish_trade_ratio": row[_SELFISH] / selfish_plus_altru,
+            "altruistic_trade_ratio": row[_ALTRUISTIC] / selfish_plus_altru,
         }
 
     return out
@@ -217,38 +257,18 @@ def resource_efficiency(results: List[GameResult]) -> Dict[int, Dict[str, float]
     - 0.3 builds/turn with 5 cards left → 0.3 / 1.5 = 0.20 efficiency
     - 0.1 builds/turn with 20 cards left → 0.1 / 3.0 = 0.03 efficiency
     """
-    stats = {
-        i: {
-            "total_builds": 0,
-            "total_turns": 0,
-            "final_resources": 0,
-        }
-        for i in range(4)
-    }
-    
-    for g in results:
-        for step in g.steps:
-            i = step.acting_player_index
-            stats[i]["total_turns"] += 1
-            
-            if step.action.type in (
-                ActionType.BUILD_SETTLEMENT,
-                ActionType.BUILD_CITY,
-                ActionType.BUILD_ROAD,
-            ):
-                stats[i]["total_builds"] += 1
-        
-        # Final resources
-        for i in range(4):
-            stats[i]["final_resources"] += _sum_resources(g.final_state.resources[i])
-    
+    return _efficiency_scores(_aggregate(results))
+
+
+def _efficiency_scores(totals: _StepTotals) -> Dict[int, Dict[str, float]]:
     out: Dict[int, Dict[str, float]] = {}
-    num_games = len(results) or 1
+    num_games = totals.num_games or 1
     
-    for i in range(4):
-        total_turns = stats[i]["total_turns"] or 1
-        build_rate = stats[i]["total_builds"] / total_turns
-        avg_final_resources = stats[i]["final_resources"] / num_games
+    for i in range(NUM_PLAYERS):
+        # A player's turns here are their decisions (one step each)
+        total_turns = totals.decisions[i] or 1
+        build_rate = totals.builds[i] / total_turns
+        avg_final_resources = totals.final_resources[i] / num_games
         
         # Efficiency: higher build rate, lower leftover resources
         out[i] = {
@@ -289,13 +309,23 @@ def overall_scores(results: List[GameResult]) -> Dict[int, Dict[str, float]]:
     - 0.2-0.4: Fair (occasional wins or high error rate)
     - <0.2  : Poor (rarely winning or very unreliable)
     """
-    win_rates = compute_win_rates(results)
-    hall = hallucination_stats(results)
-    trades = trade_behavior(results)
-    efficiency = resource_efficiency(results)
-
+    totals = _aggregate(results)
+    return _overall_scores(
+        compute_win_rates(results),
+        _hallucination_scores(totals),
+        _trade_ratios(totals),
+        _efficiency_scores(totals),
+    )
+
+
+def _overall_scores(
+    win_rates: Dict[int, float],
+    hall: Dict[int, Dict[str, float]],
+    trades: Dict[int, Dict[str, float]],
+    efficiency: Dict[int, Dict[str, float]],
+) -> Dict[int, Dict[str, float]]:
     scores: Dict[int, Dict[str, float]] = {}
-    for i in range(4):
+    for i in range(NUM_PLAYERS):
         win = win_rates.get(i, 0.0)
         hall_penalty = hall[i]["hallucination_penalty_score"]
         trade_stats = trades[i]
@@ -332,4 +362,25 @@ def overall_scores(results: List[GameResult]) -> Dict[int, Dict[str, float]]:
             "overall_score": overall,
         }
 
-    return scores
\ No newline at end of file
+    return scores
+
+
+def all_metrics(results: List[GameResult]) -> Dict[str, Any]:
+    """
+    Every metric above, keyed by function name, from one walk over the
+    steps (calling each function separately walks them once per call).
+    """
+    wins, total_turns = _game_outcomes(results)
+    totals = _aggregate(results)
+    win_rates = _win_rates(wins, len(results))
+    hall = _hallucination_scores(totals)
+    trades = _trade_ratios(totals)
+    efficiency = _efficiency_scores(totals)
+    return {
+        "average_turns": total_turns / len(results) if results else 0.0,
+        "win_rates": win_rates,
+        "hallucination_stats": hall,
+        "trade_behavior": trades,
+        "resource_efficiency": efficiency,
+        "overall_scores": _overall_scores(win_rates, hall, trades, efficiency),
+    }
@@ -2,13 +2,15 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import asyncio
 
 from env import CatanEngine, GameState, Action
-from agents import RandomAgent, LLMJsonAgent
+from agents import RandomAgent, LLMJsonAgent, StepDecisionInfo
 
 
-@dataclass
+@dataclass(slots=True)
 class StepRecord:
     state_before: GameState
     state_after: GameState
@@ -16,31 +18,65 @@ class StepRecord:
     action: Action
     legal_actions_count: int
     info: Dict[str, Any]
+    # Copies of the info flags metrics count on every step, as plain attributes
+    used_fallback: bool = False
+    action_failed: bool = False
+    api_error: bool = False
 
 
+# No slots: cached_property stores its value in the instance __dict__
 @dataclass
 class GameResult:
     steps: List[StepRecord]
     winner_index: Optional[int]
     final_state: GameState
+    # Game number within its run; kept even when other games fail and are dropped
+    game_index: int = 0
+
+    @cached_property
+    def final_resource_totals(self) -> List[int]:
+        """Cards each player holds at game end, indexed by player."""
+        return [sum(hand.values()) for hand in self.final_state.resources]
 
 
 class GameOrchestrator:
     """
     Enhanced orchestrator with better error tracking.
+
+    `engine_factory(game_num)` is optional; when given, each game of
+    `play_many_games_async` gets its own engine so games can run concurrently
+    (a CatanEngine only holds the state of one game at a time). `engine` may
+    then be None if only `play_many_games_async` is used.
+
+    Raw LLM replies are only kept in each step's info (as "raw_llm_response")
+    with `store_raw_responses=True`; they are the bulk of a long run's memory
+    and saved results leave them out anyway.
+
+    `verbose=False` drops the per-game start/summary banners (warnings about
+    a stuck game are still printed), e.g. for large batches of games.
     """
 
     def __init__(
         self,
-        engine: CatanEngine,
+        engine: Optional[CatanEngine],
         agents: List[object],
+        engine_factory: Optional[Callable[[int], CatanEngine]] = None,
+        store_raw_responses: bool = False,
+        verbose: bool = True,
     ) -> None:
         assert len(agents) == 4, "Expected exactly 4 agents (4-player Catan)."
+        assert engine is not None or engine_factory is not None, (
+            "Pass an engine or an engine_factory."
+        )
         self.engine = engine
         self.agents = agents
+        self.engine_factory = engine_factory
+        self.store_raw_responses = store_raw_responses
+        self.verbose = verbose
 
     def play_single_game(self) -> GameResult:
-        state = self.engine.start_game()
+        engine = self.engine
+        state = engine.start_game()
         done = False
         steps: List[StepRecord] = []
         winner_index: Optional[int] = None
@@ -51,7 +87,7 @@ class GameOrchestrator:
             player_idx = state.current_player_index
             agent = self.agents[player_idx]
 
-            legal_actions = self.engine.get_legal_actions()
+            legal_actions = engine.get_legal_actions()
             
             if not legal_actions:
                 print(f"⚠️ Turn {turn_count}: No legal actions for Player {player_idx}!")
@@ -60,35 +96,42 @@ class GameOrchestrator:
             # Get action from agent
             action = agent.choose_action(state, legal_actions)
 
-            # Collect decision metadata
-            decision_info = getattr(agent, "last_decision_info", None)
-            step_meta: Dict[str, Any] = {}
-            
-            if decision_info is not None:
-                step_meta["llm_valid_index"] = getattr(decision_info, "valid_index", True)
-                step_meta["llm_used_fallback"] = getattr(decision_info, "used_fallback", False)
-                step_meta["llm_api_error"] = getattr(decision_info, "api_error", False)
-                step_meta["raw_llm_response"] = getattr(decision_info, "raw_response", "")
-
-            # Execute action in environment
-            new_state, done, env_info = self.engine.step(action)
-            step_meta.update(env_info)
-
-            # Record step
-            steps.append(
-                StepRecord(
-                    state_before=state,
-                    state_after=new_state,
-                    acting_player_index=player_idx,
-                    action=action,
-                    legal_actions_count=len(legal_actions),
-                    info=step_meta,
-                )
+            state, done, winner_index = self._apply_action(
+                engine, steps, state, player_idx, agent, action, legal_actions
             )
 
-            state = new_state
-            if done:
-                winner_index = env_info.get("winner_index")
+        return GameResult(
+            steps=steps,
+            winner_index=winner_index,
+            final_state=state,
+        )
+
+    async def play_single_game_async(self, engine: Optional[CatanEngine] = None) -> GameResult:
+        """Same game loop as `play_single_game`, awaiting agent decisions."""
+        engine = engine or self.engine
+        state = engine.start_game()
+        done = False
+        steps: List[StepRecord] = []
+        winner_index: Optional[int] = None
+
+        turn_count = 0
+        while not done:
+            turn_count += 1
+            player_idx = state.current_player_index
+            agent = self.agents[player_idx]
+
+            legal_actions = engine.get_legal_actions()
+
+            if not legal_actions:
+                print(f"⚠️ Turn {turn_count}: No legal actions for Player {player_idx}!")
+                break
+
+            # Get action from agent (other games keep running meanwhile)
+            action = await agent.decide(state, legal_actions)
+
+            state, done, winner_index = self._apply_action(
+                engine, steps, state, player_idx, agent, action, legal_actions
+            )
 
         return GameResult(
             steps=steps,
@@ -96,22 +139,145 @@ class GameOrchestrator:
             final_state=state,
         )
 
+    def _apply_action(
+        self,
+        engine: CatanEngine,
+        steps: List[StepRecord],
+        state: GameState,
+        player_idx: int,
+        agent: object,
+        action: Action,
+        legal_actions: List[Action],
+    ) -> Tuple[GameState, bool, Optional[int]]:
+        """Step the engine with the chosen action and record it."""
+        # Collect decision metadata (a StepDecisionInfo, set on every decision)
+        decision_info: Optional[StepDecisionInfo] = getattr(agent, "last_decision_info", None)
+        step_meta: Dict[str, Any]
+        if decision_info is not None:
+            step_meta = {
+                "llm_valid_index": decision_info.valid_index,
+                "llm_used_fallback": decision_info.used_fallback,
+                "llm_api_error": decision_info.api_error,
+            }
+            if self.store_raw_responses:
+                step_meta["raw_llm_response"] = decision_info.raw_response
+        else:
+            step_meta = {}
+
+        # Execute action in environment
+        new_state, done, env_info = engine.step(action)
+        step_meta.update(env_info)
+
+        # Record step
+        steps.append(
+            StepRecord(
+                state_before=state,
+                state_after=new_state,
+                acting_player_index=player_idx,
+                action=action,
+                legal_actions_count=len(legal_actions),
+                info=step_meta,
+                used_fallback=bool(step_meta.get("llm_used_fallback", False)),
+                action_failed=bool(step_meta.get("action_failed", False)),
+                api_error=bool(step_meta.get("llm_api_error", False)),
+            )
+        )
+
+        winner_index = env_info.get("winner_index") if done else None
+        return new_state, done, winner_index
+
     def play_many_games(self, n_games: int) -> List[GameResult]:
-        results: List[GameResult] = []
+        return list(self.play_many_games_stream(n_games))
+
+    def play_many_games_stream(self, n_games: int) -> Iterator[GameResult]:
+        """
+        Yield each game's result as soon as it finishes, so a caller that
+        writes or summarizes games one at a time never holds them all.
+        """
         for game_num in range(n_games):
-            print(f"\n{'='*60}")
-            print(f"Starting Game {game_num + 1}/{n_games}")
-            print(f"{'='*60}")
+            self._print_game_start(game_num, n_games)
             result = self.play_single_game()
-            results.append(result)
-            
-            # Print game summary
-            if result.winner_index is not None:
-                winner_name = self.agents[result.winner_index].name
-                print(f"\n🏆 Winner: {winner_name} (Player {result.winner_index})")
+            result.game_index = game_num
+            self._print_game_summary(result)
+            yield result
+
+    async def play_many_games_async(
+        self, n_games: int, max_concurrency: Optional[int] = None
+    ) -> List[GameResult]:
+        """
+        Play `n_games`, overlapping their LLM calls.
+
+        With an `engine_factory` all games run concurrently, so per-decision
+        network latency is paid roughly once per turn across the batch instead
+        of once per game; `max_concurrency` caps how many are in flight at once
+        (e.g. to stay inside provider rate limits). Without a factory, games
+        share `self.engine` and are played one after another.
+
+        A game that raises is reported and left out of the results, so one
+        bad game does not throw away the ones that finished.
+        """
+        if self.engine_factory is None:
+            results: List[GameResult] = []
+            for game_num in range(n_games):
+                try:
+                    results.append(
+                        await self._play_game_async(game_num, n_games, self.engine)
+                    )
+                except Exception as e:
+                    self._print_game_failure(game_num, e)
+            return results
+
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+        async def play(game_num: int) -> GameResult:
+            if semaphore is None:
+                return await self._play_game_async(
+                    game_num, n_games, self.engine_factory(game_num)
+                )
+            async with semaphore:
+                return await self._play_game_async(
+                    game_num, n_games, self.engine_factory(game_num)
+                )
+
+        outcomes = await asyncio.gather(
+            *(play(game_num) for game_num in range(n_games)), return_exceptions=True
+        )
+        results = []
+        for game_num, outcome in enumerate(outcomes):
+            if isinstance(outcome, Exception):
+                self._print_game_failure(game_num, outcome)
+            elif isinstance(outcome, BaseException):
+                raise outcome  # cancellation / interrupt: stop the run
             else:
-                print(f"\n⚠️ Game ended without winner (turn limit reached)")
-            print(f"Final VP: {result.final_state.victory_points}")
-            print(f"Total turns: {result.final_state.turn}")
-            
-        return results
\ No newline at end of file
+                results.append(outcome)
+        return results
+
+    async def _play_game_async(
+        self, game_num: int, n_games: int, engine: CatanEngine
+    ) -> GameResult:
+        self._print_game_start(game_num, n_games)
+        result = await self.play_single_game_async(engine)
+        result.game_index = game_num
+        self._print_game_summary(result)
+        return result
+
+    def _print_game_start(self, game_num: int, n_games: int) -> None:
+        if not self.verbose:
+            return
+        print(f"\n{'='*60}")
+        print(f"Starting Game {game_num + 1}/{n_games}")
+        print(f"{'='*60}")
+
+    def _print_game_failure(self, game_num: int, error: Exception) -> None:
+        print(f"\n❌ Game {game_num + 1} failed and is left out of the results: {error!r}")
+
+    def _print_game_summary(self, result: GameResult) -> None:
+        if not self.verbose:
+            return
+        if result.winner_index is not None:
+            winner_name = self.agents[result.winner_index].name
+            print(f"\n🏆 Winner: {winner_name} (Player {result.winner_index})")
+        else:
+            print(f"\n⚠️ Game ended without winner (turn limit reached)")
+        print(f"Final VP: {result.final_state.victory_points}")
+        print(f"Total turns: {result.final_state.turn}")
@@ -0,0 +1,73 @@
+# rate_limit.py - Client-side request/token throttling for the chat fns
+"""
+Token buckets that hold a call back *before* it is sent, so a burst of
+concurrent games stays under a provider's requests-per-minute and
+tokens-per-minute ceilings instead of tripping 429s and sitting in backoff.
+
+Each acquire reserves its share up front and sleeps for however long the
+bucket needs to refill, so callers are served in arrival order and the same
+limiter works from threads (sync chat fns) and the event loop (async ones).
+"""
+from __future__ import annotations
+
+from typing import Dict, List
+import asyncio
+import threading
+import time
+
+# Rough chars-per-token ratio for English prompt text (no tokenizer needed)
+_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_output_tokens: int = 0) -> int:
+    """Approximate prompt tokens plus the completion budget of one call."""
+    chars = sum(len(m.get("content", "")) for m in messages)
+    return chars // _CHARS_PER_TOKEN + max_output_tokens
+
+
+class TokenBucket:
+    """Holds up to `capacity` units, refilled continuously at `rate_per_min`."""
+
+    def __init__(self, rate_per_min: float, capacity: float) -> None:
+        self.rate_per_sec = rate_per_min / 60.0
+        self.capacity = capacity
+        self._level = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` now and return the seconds to wait before using it."""
+        # A request bigger than the whole bucket would otherwise never fit
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._level = min(
+                self.capacity, self._level + (now - self._updated) * self.rate_per_sec
+            )
+            self._updated = now
+            self._level -= amount
+            if self._level >= 0:
+                return 0.0
+            return -self._level / self.rate_per_sec
+
+
+class RateLimiter:
+    """Per-provider requests-per-minute and tokens-per-minute limits."""
+
+    def __init__(self, rpm: float, tpm: float) -> None:
+        # One minute's allowance may go out as a burst
+        self.requests = TokenBucket(rpm, rpm)
+        self.tokens = TokenBucket(tpm, tpm)
+
+    def _reserve(self, tokens: int) -> float:
+        return max(self.requests.reserve(1), self.tokens.reserve(tokens))
+
+    def acquire(self, tokens: int) -> None:
+        delay = self._reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens: int) -> None:
+        delay = self._reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
@@ -0,0 +1,305 @@
+# runner.py - Game-running, metrics, reporting and saving shared by the benchmark scripts
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to ujson, then the stdlib encoder
+    orjson = None
+try:
+    import ujson
+except ImportError:  # optional: only used when orjson is missing
+    ujson = None
+
+from env import PyCatanEngine
+from orchestrator import GameOrchestrator, GameResult
+from metrics import all_metrics
+from llm_cache import cache_stats
+
+# Step info left out of saved results (large text)
+_EXCLUDED_INFO_KEYS = frozenset({"raw_llm_response"})
+
+# Game N is played with seed BASE_SEED + N, so runs are reproducible
+BASE_SEED = 42
+
+
+def make_engine_factory(
+    target_vp: int, max_turns: int, verbose: bool = True
+) -> Callable[[int], PyCatanEngine]:
+    """Returns `make_engine(game_num)`: a fresh engine per game, seeded by game number."""
+
+    def make_engine(game_num: int) -> PyCatanEngine:
+        return PyCatanEngine(
+            num_players=4,
+            target_vp=target_vp,
+            max_turns=max_turns,
+            seed=BASE_SEED + game_num,
+            verbose=verbose,
+        )
+
+    return make_engine
+
+
+def run_games(
+    agents: List[object],
+    make_engine: Callable[[int], PyCatanEngine],
+    n_games: int,
+    max_concurrency: int = 0,
+    verbose: bool = True,
+) -> List[GameResult]:
+    """
+    Play `n_games` concurrently (one engine per game, LLM calls overlapped)
+    and return the results in game order. `max_concurrency` = 0 means no cap;
+    `verbose=False` skips the per-game banners (pair it with a quiet
+    `make_engine_factory(..., verbose=False)` to drop the turn progress too).
+    """
+    orchestrator = GameOrchestrator(
+        None, agents, engine_factory=make_engine, verbose=verbose
+    )
+    return asyncio.run(
+        orchestrator.play_many_games_async(n_games=n_games, max_concurrency=max_concurrency)
+    )
+
+
+def compute_metrics(results: List[GameResult]) -> Dict[str, Any]:
+    """
+    Every metric for one run, keyed by metric name (then player index).
+
+    The step stream is walked once for all of them, and nothing is kept
+    around afterwards that would pin the results in memory.
+    """
+    return all_metrics(results)
+
+
+def _step_to_dict(step) -> Dict[str, Any]:
+    info = step.info
+    before = step.state_before
+    saved_info = dict(info)
+    for key in _EXCLUDED_INFO_KEYS:
+        saved_info.pop(key, None)
+    step_data = {
+        "turn": before.turn,
+        "acting_player": step.acting_player_index,
+        "action_type": step.action.type.name,
+        "action_payload": step.action.payload,  # plain JSON values (ints, names, coords)
+        "legal_actions_count": step.legal_actions_count,
+        "victory_points_before": before.victory_points,
+        "victory_points_after": step.state_after.victory_points,
+        "info": saved_info,
+    }
+
+    # Add LLM-specific tracking
+    if "llm_valid_index" in info:
+        step_data["llm_valid_index"] = info["llm_valid_index"]
+        step_data["llm_used_fallback"] = info["llm_used_fallback"]
+        step_data["llm_api_error"] = info.get("llm_api_error", False)
+
+    if "action_failed" in info:
+        step_data["action_failed"] = info["action_failed"]
+
+    return step_data
+
+
+def _game_to_dict(game) -> Dict[str, Any]:
+    return {
+        "game_index": game.game_index,
+        "winner_index": game.winner_index,
+        "final_turn": game.final_state.turn,
+        "final_victory_points": game.final_state.victory_points,
+        "final_resources": game.final_state.resources,
+        "steps": [_step_to_dict(step) for step in game.steps],
+    }
+
+
+def _dumps(obj: Any, indent: bool = True) -> bytes:
+    if orjson is not None:
+        # Non-str keys (e.g. player indices) are stringified, as json.dumps does
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option, default=str)
+    if ujson is not None:
+        return ujson.dumps(obj, indent=2 if indent else 0, ensure_ascii=False).encode("utf-8")
+    if indent:
+        return json.dumps(obj, indent=2).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def save_results_to_json(results, metrics, filename=None, format=None):
+    """
+    Save results for analysis.
+
+    format="ndjson" writes one game per line to `<name>.ndjson` and the run
+    summary (timestamp, num_games, metrics) to `<name>_metrics.json`, so
+    analyses can stream the games file line by line.
+    format="json" writes a single `<name>.json` document with a "games" array.
+
+    Without a format, an explicit `filename` picks it by extension (.ndjson /
+    .jsonl -> ndjson, anything else -> json); with neither, ndjson is used.
+
+    Either way games are converted and written one at a time, so only one
+    game's records are held in memory alongside the results.
+    """
+    if format is None:
+        if filename is None:
+            format = "ndjson"
+        elif os.path.splitext(filename)[1].lower() in (".ndjson", ".jsonl"):
+            format = "ndjson"
+        else:
+            format = "json"
+    if format not in ("ndjson", "json"):
+        raise ValueError(f"Unknown results format: {format!r}")
+    if filename is None:
+        filename = f"game_results_{time.strftime('%Y%m%d_%H%M%S')}.{format}"
+
+    summary = {
+        "timestamp": datetime.now().isoformat(),
+        "num_games": len(results),
+        "metrics": metrics,
+    }
+
+    if format == "ndjson":
+        metrics_filename = f"{os.path.splitext(filename)[0]}_metrics.json"
+        with open(metrics_filename, "wb") as f:
+            f.write(_dumps(summary))
+        with open(filename, "wb") as f:
+            for game in results:
+                f.write(_dumps(_game_to_dict(game), indent=False))
+                f.write(b"\n")
+        print(f"\n💾 Results saved to: {filename} (summary: {metrics_filename})")
+        return filename
+
+    with open(filename, "wb") as f:
+        f.write(b'{\n"timestamp": ' + _dumps(summary["timestamp"]))
+        f.write(b',\n"num_games": ' + _dumps(summary["num_games"]))
+        f.write(b',\n"metrics": ' + _dumps(metrics))
+        f.write(b',\n"games": [\n')
+        for position, game in enumerate(results):
+            if position:
+                f.write(b",\n")
+            f.write(_dumps(_game_to_dict(game)))
+        f.write(b"\n]\n}\n")
+
+    print(f"\n💾 Results saved to: {filename}")
+    return filename
+
+
+def print_results(results, agents):
+    """Print formatted results."""
+    metrics = compute_metrics(results)
+    avg_t = metrics["average_turns"]
+    win_rates = metrics["win_rates"]
+    hall = metrics["hallucination_stats"]
+    trades = metrics["trade_behavior"]
+    efficiency = metrics["resource_efficiency"]
+    scores = metrics["overall_scores"]
+
+    agent_names = [a.name for a in agents]
+
+    print("\n" + "=" * 70)
+    print("BENCHMARK RESULTS")
+    print("=" * 70)
+
+    print(f"\n📊 Games Completed: {len(results)}")
+    print(f"📈 Average Turns: {avg_t:.1f}")
+
+    print("\n🏆 WIN RATES")
+    print("-" * 70)
+    for i, rate in sorted(win_rates.items(), key=lambda x: x[1], reverse=True):
+        bar = "█" * int(rate * 50)
+        print(f"{agent_names[i]:<25} {rate:>6.1%} {bar}")
+
+    print("\n🧠 HALLUCINATION ANALYSIS")
+    print("-" * 70)
+    for i, st in hall.items():
+        print(f"\n{agent_names[i]} (Player {i}):")
+        print(f"  Total decisions:     {st['decisions']:>6.0f}")
+        print(f"  Index errors:        {st['index_hallucinations']:>6.0f}")
+        print(f"  Action failures:     {st['action_failures']:>6.0f}")
+        print(f"  Total hallucinations: {st['total_hallucinations']:>6.0f}")
+        print(f"  Hallucination rate:  {st['hallucination_rate']:>6.1%}")
+        print(f"  Penalty score:       {st['hallucination_penalty_score']:>6.3f}")
+
+    print("\n💰 TRADE BEHAVIOR")
+    print("-" * 70)
+    for i, st in trades.items():
+        print(f"\n{agent_names[i]} (Player {i}):")
+        print(f"  Player trades:       {st['num_player_trades']:>6.0f}")
+        print(f"  Bank trades:         {st['num_bank_trades']:>6.0f}")
+        print(f"  Total trades:        {st['total_trades']:>6.0f}")
+        if st['total_trades'] > 0:
+            print(f"  Helping leader:      {st['trades_helping_leader_ratio']:>6.1%}")
+            print(f"  Helping last place:  {st['trades_helping_last_ratio']:>6.1%}")
+
+    print("\n⚡ RESOURCE EFFICIENCY")
+    print("-" * 70)
+    for i, st in efficiency.items():
+        print(f"\n{agent_names[i]} (Player {i}):")
+        print(f"  Build rate:          {st['build_rate']:>6.3f} builds/turn")
+        print(f"  Avg final resources: {st['avg_final_resources']:>6.1f} cards")
+        print(f"  Efficiency score:    {st['efficiency_score']:>6.3f}")
+
+    print("\n🎯 OVERALL SCORES")
+    print("-" * 70)
+    print("Formula: win_rate × hallucination_penalty × (0.5 + 0.3×trade_activity + 0.2×game_sense)")
+    print("  • Base: 50% credit for winning")
+    print("  • Trade activity: +30% for active trading (max 15 trades)")
+    print("  • Game sense: +20% for strategic play (help weak, avoid helping leader)")
+    print()
+    sorted_scores = sorted(scores.items(), key=lambda x: x[1]['overall_score'], reverse=True)
+    for i, st in sorted_scores:
+        print(f"\n{agent_names[i]} (Player {i}):")
+        print(f"  Win rate:            {st['win_rate']:>6.1%}")
+        print(f"  Overall score:       {st['overall_score']:>6.3f} ⭐")
+        print(f"  Game sense:          {st['game_sense']:>6.3f}")
+        print(f"  Trade activity:      {st['trade_activity']:>6.3f}")
+
+    cache = cache_stats()
+    if cache:
+        print("\n💾 LLM RESPONSE CACHE")
+        print("-" * 70)
+        for model, st in cache.items():
+            print(f"\n{model}:")
+            print(f"  Hits:                {st['hits']:>6.0f}")
+            print(f"  Misses:              {st['misses']:>6.0f}")
+            print(f"  Shared in-flight:    {st['coalesced']:>6.0f}")
+            print(f"  Hit rate:            {st['hit_rate']:>6.1%}")
+
+    print("\n" + "=" * 70)
+
+    # Return metrics for saving
+    return {
+        "average_turns": avg_t,
+        "win_rates": {f"player_{i}": rate for i, rate in win_rates.items()},
+        "hallucination_stats": {f"player_{i}": st for i, st in hall.items()},
+        "trade_behavior": {f"player_{i}": st for i, st in trades.items()},
+        "resource_efficiency": {f"player_{i}": st for i, st in efficiency.items()},
+        "overall_scores": {f"player_{i}": st for i, st in scores.items()},
+        "llm_cache": cache,
+    }
+
+
+def run_and_report(
+    agents: List[object],
+    make_engine: Callable[[int], PyCatanEngine],
+    n_games: int,
+    max_concurrency: int = 0,
+    save: bool = True,
+    results: Optional[List[GameResult]] = None,
+    verbose: bool = True,
+) -> Tuple[List[GameResult], Dict[str, Any]]:
+    """
+    Play the games (unless `results` are passed in), print the report and
+    optionally save it; returns `(results, metrics)` with the saved metrics.
+    `verbose=False` skips the per-game banners while playing.
+    """
+    if results is None:
+        results = run_games(agents, make_engine, n_games, max_concurrency, verbose)
+    metrics = print_results(results, agents)
+    if save:
+        save_results_to_json(results, metrics)
+    return results, metrics
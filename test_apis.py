@@ -1,11 +1,17 @@
 # test_apis.py - Simple API test
-from llm_clients import openai_chat_fn, claude_chat_fn, gemini_chat_fn
-import json
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+# Always call the providers: a cached reply would say nothing about the API
+os.environ["LLM_CACHE_PATH"] = ""
+
+from llm_clients import openai_chat_fn, claude_chat_fn, gemini_chat_fn, _json_loads
 
 
 def test_api(name: str, chat_fn):
     """Test a single API."""
-    print(f"\nTesting {name}...")
+    # Buffered and printed at the end, since the APIs are tested concurrently
+    lines = [f"\nTesting {name}..."]
     
     messages = [
         {"role": "system", "content": "Respond with JSON only."},
@@ -14,25 +20,27 @@ def test_api(name: str, chat_fn):
     
     try:
         response = chat_fn(messages)
-        print(f"  Response: {response[:100]}")
+        lines.append(f"  Response: {response[:100]}")
         
-        parsed = json.loads(response)
+        parsed = _json_loads(response)
         
         if "action_index" in parsed:
             idx = parsed["action_index"]
             if isinstance(idx, int) and 0 <= idx <= 5:
-                print(f"  ✅ WORKING - Got valid index: {idx}")
+                lines.append(f"  ✅ WORKING - Got valid index: {idx}")
                 return True
             else:
-                print(f"  ⚠️  Got index but invalid: {idx}")
+                lines.append(f"  ⚠️  Got index but invalid: {idx}")
                 return False
         else:
-            print(f"  ❌ FAILED - No action_index in response")
+            lines.append(f"  ❌ FAILED - No action_index in response")
             return False
             
     except Exception as e:
-        print(f"  ❌ FAILED - {str(e)[:100]}")
+        lines.append(f"  ❌ FAILED - {str(e)[:100]}")
         return False
+    finally:
+        print("\n".join(lines))
 
 
 def main():
@@ -40,11 +48,18 @@ def main():
     print("API TEST")
     print("="*60)
     
-    results = {
-        "OpenAI gpt-4o-mini": test_api("OpenAI", openai_chat_fn),
-        "Claude Haiku 3.5": test_api("Claude", claude_chat_fn),
-        "Gemini 1.5 Flash": test_api("Gemini", gemini_chat_fn),
+    tests = {
+        "OpenAI gpt-4o-mini": ("OpenAI", openai_chat_fn),
+        "Claude Haiku 3.5": ("Claude", claude_chat_fn),
+        "Gemini 1.5 Flash": ("Gemini", gemini_chat_fn),
     }
+    # One thread per API: the three round-trips overlap instead of adding up
+    with ThreadPoolExecutor(max_workers=len(tests)) as pool:
+        futures = {
+            name: pool.submit(test_api, label, chat_fn)
+            for name, (label, chat_fn) in tests.items()
+        }
+        results = {name: future.result() for name, future in futures.items()}
     
     print("\n" + "="*60)
     print("RESULTS")
@@ -61,4 +76,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()